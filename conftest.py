@@ -0,0 +1,81 @@
+"""
+Pytest configuration for the validation tests
+"""
+import hashlib
+import os
+import sys
+
+import pytest
+
+# Repo root on sys.path once per session so `src.*` imports resolve no
+# matter which directory pytest is invoked from. The standalone
+# `python test_validation.py` path gets this for free via sys.path[0].
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+# Tests whose outcome depends only on files on disk; when those files
+# are unchanged since the last fully green run the test is skipped.
+# Pass --force to run them regardless.
+_TEST_DEPS = {
+    "test_scenario_loading": ("scenarios/sample_scenarios.json",),
+    "test_prompt_templates": (
+        "prompts/agent_system.txt",
+        "prompts/client_system.txt",
+        "prompts/evaluator_system.txt",
+    ),
+    "test_cli_structure": ("simulate.py",),
+}
+
+_CACHE_KEY = "validation/dep_hashes"
+
+def _dep_hash(paths):
+    """Fingerprint of the dependency files' mtimes and sizes, or None
+    if any of them is missing"""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        try:
+            st = os.stat(os.path.join(_ROOT, path))
+        except OSError:
+            return None
+        h.update(f"{path}:{st.st_mtime_ns}:{st.st_size}".encode())
+    return h.hexdigest()
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--force", action="store_true", default=False,
+        help="run file-dependent validation tests even if their inputs are unchanged"
+    )
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--force"):
+        return
+    cached = config.cache.get(_CACHE_KEY, {})
+    skip_unchanged = pytest.mark.skip(reason="inputs unchanged since last green run")
+    for item in items:
+        deps = _TEST_DEPS.get(item.name)
+        if deps and cached.get(item.name) == _dep_hash(deps):
+            item.add_marker(skip_unchanged)
+
+def pytest_sessionfinish(session, exitstatus):
+    # Only a fully green session may mark its inputs as known-good
+    if exitstatus != 0:
+        return
+    hashes = {}
+    for name, deps in _TEST_DEPS.items():
+        fingerprint = _dep_hash(deps)
+        if fingerprint is not None:
+            hashes[name] = fingerprint
+    session.config.cache.set(_CACHE_KEY, hashes)
+
+@pytest.fixture(scope="session")
+def scenarios():
+    """Parsed sample scenarios, read and parsed once per session"""
+    import test_validation
+    return test_validation._load_scenarios()
+
+@pytest.fixture(scope="session")
+def prompt_entries():
+    """Prompt template DirEntry objects keyed by path, listed once per session"""
+    import test_validation
+    return test_validation._load_prompts()
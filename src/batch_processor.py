@@ -2,19 +2,36 @@
 Batch processing system for parallel conversation simulation
 """
 import asyncio
+import os
+import queue
+import threading
 import uuid
-import json
+import orjson
 import time
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from datetime import datetime
+from collections import OrderedDict
 from dataclasses import dataclass, asdict
 from enum import Enum
 from src.config import Config
 from src.openai_wrapper import OpenAIWrapper
 from src.conversation_engine import ConversationEngine
 from src.evaluator import ConversationEvaluator
+from src.result_cache import ResultCache
 from src.logging_utils import get_logger
 
+# Template for scenarios that raised instead of returning a result; copied
+# and updated per failure instead of rebuilding the dict literal in the loop
+_FAILED_RESULT_TEMPLATE = {
+    'scenario_index': None,
+    'scenario': None,
+    'status': 'failed',
+    'error': None,
+    'session_id': None,
+    'score': 1,
+    'comment': None
+}
+
 class BatchStatus(Enum):
     """Batch processing status"""
     PENDING = "pending"
@@ -23,7 +40,7 @@ class BatchStatus(Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
-@dataclass
+@dataclass(slots=True)
 class BatchJob:
     """Batch job data structure"""
     batch_id: str
@@ -32,41 +49,61 @@ class BatchJob:
     created_at: datetime
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    # Monotonic counterparts for duration/age math; the datetime fields are
+    # kept only for display at the API boundary
+    started_monotonic: Optional[float] = None
+    completed_monotonic: Optional[float] = None
     total_scenarios: int = 0
     completed_scenarios: int = 0
     failed_scenarios: int = 0
     progress_percentage: float = 0.0
     results: List[Dict[str, Any]] = None
     error_message: Optional[str] = None
-    
+    scenario_names: List[str] = None
+    # Cached serializable status view; stable fields are formatted once
+    status_view: Optional[Dict[str, Any]] = None
+    # Bumped on every observable change; lets the API answer polls with
+    # 304 Not Modified instead of re-serializing identical payloads
+    status_version: int = 0
+
     def __post_init__(self):
         if self.results is None:
             self.results = []
         if self.total_scenarios == 0:
             self.total_scenarios = len(self.scenarios)
+        if self.scenario_names is None:
+            # Materialize display names once; the f-string fallback only
+            # fires for unnamed scenarios
+            self.scenario_names = [
+                s.get('name') or f'scenario_{i}' for i, s in enumerate(self.scenarios)
+            ]
 
 class BatchProcessor:
     """Manages batch processing of conversation simulations"""
     
-    def __init__(self, openai_api_key: str, concurrency: Optional[int] = None):
+    def __init__(self, openai_api_key: str, concurrency: Optional[int] = None, use_cache: bool = True):
         self.concurrency = concurrency or Config.CONCURRENCY
-        self.semaphore = asyncio.Semaphore(self.concurrency)
         self.logger = get_logger()
-        
+
         # Initialize components
         self.openai_wrapper = OpenAIWrapper(openai_api_key)
         self.conversation_engine = ConversationEngine(self.openai_wrapper)
         self.evaluator = ConversationEvaluator(self.openai_wrapper)
+        self.result_cache = ResultCache() if use_cache else None
         
-        # Active batch jobs
-        self.active_jobs: Dict[str, BatchJob] = {}
+        # Active batch jobs, oldest first, LRU-bounded by Config.MAX_ACTIVE_JOBS
+        self.active_jobs: 'OrderedDict[str, BatchJob]' = OrderedDict()
         
         self.logger.log_info(f"BatchProcessor initialized with concurrency: {self.concurrency}")
     
     def create_batch_job(self, scenarios: List[Dict[str, Any]]) -> str:
-        """Create a new batch job"""
+        """Create a new batch job from a list or stream of scenarios"""
         batch_id = str(uuid.uuid4())
-        
+
+        # Accept lazy iterables (e.g. streamed NDJSON) as well as lists
+        if not isinstance(scenarios, list):
+            scenarios = list(scenarios)
+
         batch_job = BatchJob(
             batch_id=batch_id,
             scenarios=scenarios,
@@ -76,7 +113,17 @@ class BatchProcessor:
         )
         
         self.active_jobs[batch_id] = batch_job
-        
+
+        # Evict the oldest finished job once over capacity, so a flood of
+        # small batches cannot grow memory unbounded before the age-based
+        # cleanup fires. Pending/running jobs are never evicted.
+        if len(self.active_jobs) > Config.MAX_ACTIVE_JOBS:
+            for old_id, old_job in self.active_jobs.items():
+                if old_job.status not in (BatchStatus.PENDING, BatchStatus.RUNNING):
+                    del self.active_jobs[old_id]
+                    self.logger.log_info(f"Evicted old batch job", extra_data={'batch_id': old_id})
+                    break
+
         self.logger.log_info(f"Created batch job", extra_data={
             'batch_id': batch_id,
             'total_scenarios': len(scenarios)
@@ -88,21 +135,55 @@ class BatchProcessor:
         """Get status of a batch job"""
         if batch_id not in self.active_jobs:
             return None
-        
-        job = self.active_jobs[batch_id]
-        return {
-            'batch_id': batch_id,
-            'status': job.status.value,
-            'progress': job.progress_percentage,
-            'total_scenarios': job.total_scenarios,
-            'completed_scenarios': job.completed_scenarios,
-            'failed_scenarios': job.failed_scenarios,
-            'created_at': job.created_at.isoformat(),
-            'started_at': job.started_at.isoformat() if job.started_at else None,
-            'completed_at': job.completed_at.isoformat() if job.completed_at else None,
-            'error_message': job.error_message
-        }
+
+        return self._status_view(batch_id, self.active_jobs[batch_id])
+
+    def get_all_statuses(self) -> List[Dict[str, Any]]:
+        """Status views for every active job in one traversal
+
+        Saves the per-id dict lookup that calling get_batch_status in a
+        loop would repeat for each job.
+        """
+        return [self._status_view(batch_id, job) for batch_id, job in self.active_jobs.items()]
+
+    def _status_view(self, batch_id: str, job: BatchJob) -> Dict[str, Any]:
+        """Build or refresh the cached serializable status dict"""
+        view = job.status_view
+
+        if view is None:
+            view = {
+                'batch_id': batch_id,
+                'status': job.status.value,
+                'progress': job.progress_percentage,
+                'total_scenarios': job.total_scenarios,
+                'completed_scenarios': job.completed_scenarios,
+                'failed_scenarios': job.failed_scenarios,
+                'created_at': job.created_at.isoformat(),
+                'started_at': job.started_at.isoformat() if job.started_at else None,
+                'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+                'error_message': job.error_message
+            }
+            job.status_view = view
+        else:
+            # Refresh only the fields that change while a batch runs;
+            # created_at and the timestamps are formatted at most once
+            view['status'] = job.status.value
+            view['progress'] = job.progress_percentage
+            view['completed_scenarios'] = job.completed_scenarios
+            view['failed_scenarios'] = job.failed_scenarios
+            view['error_message'] = job.error_message
+            if view['started_at'] is None and job.started_at:
+                view['started_at'] = job.started_at.isoformat()
+            if view['completed_at'] is None and job.completed_at:
+                view['completed_at'] = job.completed_at.isoformat()
+
+        return view
     
+    def get_status_version(self, batch_id: str) -> Optional[int]:
+        """Monotonic change counter for a job, for ETag generation"""
+        job = self.active_jobs.get(batch_id)
+        return job.status_version if job is not None else None
+
     def get_batch_results(self, batch_id: str) -> Optional[List[Dict[str, Any]]]:
         """Get results of a completed batch job"""
         if batch_id not in self.active_jobs:
@@ -125,6 +206,8 @@ class BatchProcessor:
         # Update job status
         job.status = BatchStatus.RUNNING
         job.started_at = datetime.now()
+        job.started_monotonic = time.monotonic()
+        job.status_version += 1
         
         self.logger.log_info(f"Starting batch processing", extra_data={
             'batch_id': batch_id,
@@ -132,20 +215,122 @@ class BatchProcessor:
             'concurrency': self.concurrency
         })
         
+        ndjson_writer = None
         try:
-            # Create tasks for all scenarios
-            tasks = []
+            # Feed scenarios through a bounded queue into a fixed worker pool.
+            # Only O(concurrency) tasks exist at any time, instead of one Task
+            # per scenario as with a big asyncio.gather.
+            scenario_queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+            eval_queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+            results: List[Any] = [None] * job.total_scenarios
+            completed_count = 0
+            eval_concurrency = Config.EVAL_CONCURRENCY or max(2, self.concurrency // 2)
+
+            # Append each result to disk as it finishes, so partial output
+            # survives a crash and the final save does not re-serialize the
+            # whole batch in one go
+            Config.ensure_directories()
+            ndjson_path = os.path.join(Config.RESULTS_DIR, f"batch_{batch_id}_incremental.ndjson")
+
+            # Appends happen on a writer thread (same pattern as the
+            # conversation log), so a slow disk flush never stalls the
+            # event loop between turns
+            ndjson_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+            def drain_ndjson():
+                with open(ndjson_path, 'wb', buffering=1 << 17) as f:
+                    while True:
+                        line = ndjson_queue.get()
+                        if line is None:
+                            break
+                        f.write(line)
+
+            ndjson_writer = threading.Thread(target=drain_ndjson, daemon=True)
+            ndjson_writer.start()
+
+            def finish(index: int, result: Any):
+                nonlocal completed_count
+                results[index] = result
+                completed_count += 1
+                if isinstance(result, dict):
+                    ndjson_queue.put(orjson.dumps({'batch_id': batch_id, **result}) + b'\n')
+
+            async def conversation_worker():
+                # Stage 1: run conversations; finished transcripts are handed
+                # to the evaluator pool instead of being evaluated inline, so
+                # the next conversation starts while evaluation is in flight
+                while True:
+                    item = await scenario_queue.get()
+                    if item is None:
+                        break
+                    index, scenario = item
+                    try:
+                        stage, payload = await self._run_conversation_stage(
+                            scenario, index, batch_id, job.scenario_names[index]
+                        )
+                    except Exception as e:
+                        finish(index, e)
+                        await self._update_progress(batch_id, completed_count)
+                        continue
+                    if stage == 'evaluate':
+                        await eval_queue.put(payload)
+                    else:
+                        finish(index, payload)
+                        await self._update_progress(batch_id, completed_count)
+
+            async def evaluation_worker():
+                # Stage 2: score completed transcripts
+                while True:
+                    pending = await eval_queue.get()
+                    if pending is None:
+                        break
+                    try:
+                        result = await self._evaluate_stage(pending, batch_id)
+                    except Exception as e:
+                        result = e
+                    finish(pending['scenario_index'], result)
+                    await self._update_progress(batch_id, completed_count)
+
+            async def progress_reporter():
+                # Flush progress at a fixed interval instead of per scenario,
+                # so the callback (typically a print) is not a serialization
+                # point at high throughput
+                last_reported = 0
+                while completed_count < job.total_scenarios:
+                    await asyncio.sleep(0.25)
+                    if completed_count != last_reported:
+                        last_reported = completed_count
+                        if asyncio.iscoroutinefunction(progress_callback):
+                            await progress_callback(batch_id, completed_count)
+                        else:
+                            progress_callback(batch_id, completed_count)
+
+            conversation_workers = [asyncio.ensure_future(conversation_worker()) for _ in range(self.concurrency)]
+            evaluation_workers = [asyncio.ensure_future(evaluation_worker()) for _ in range(eval_concurrency)]
+            reporter = asyncio.ensure_future(progress_reporter()) if progress_callback else None
+
             for i, scenario in enumerate(job.scenarios):
-                task = self._process_single_scenario(
-                    scenario=scenario,
-                    scenario_index=i,
-                    batch_id=batch_id,
-                    progress_callback=progress_callback
-                )
-                tasks.append(task)
-            
-            # Run all tasks concurrently
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+                await scenario_queue.put((i, scenario))
+
+            # Signal conversation workers to stop once the queue drains, then
+            # shut down the evaluator pool after the last transcript is queued
+            for _ in conversation_workers:
+                await scenario_queue.put(None)
+
+            await asyncio.gather(*conversation_workers)
+
+            for _ in evaluation_workers:
+                await eval_queue.put(None)
+
+            await asyncio.gather(*evaluation_workers)
+
+            if reporter:
+                reporter.cancel()
+                # Final report so the caller always sees N/N
+                if asyncio.iscoroutinefunction(progress_callback):
+                    await progress_callback(batch_id, completed_count)
+                else:
+                    progress_callback(batch_id, completed_count)
             
             # Process results
             successful_results = []
@@ -157,15 +342,15 @@ class BatchProcessor:
                     failed_count += 1
                     
                     # Add failed result
-                    failed_result = {
-                        'scenario_index': i,
-                        'scenario': job.scenarios[i].get('name', f'scenario_{i}'),
-                        'status': 'failed',
-                        'error': str(result),
-                        'session_id': None,
-                        'score': 1,
-                        'comment': f"Ошибка обработки: {str(result)}"
-                    }
+                    error_text = str(result)
+                    failed_result = _FAILED_RESULT_TEMPLATE.copy()
+                    failed_result.update(
+                        scenario_index=i,
+                        scenario=job.scenario_names[i],
+                        error=error_text,
+                        comment=f"Ошибка обработки: {error_text}"
+                    )
+                    ndjson_queue.put(orjson.dumps({'batch_id': batch_id, **failed_result}) + b'\n')
                     successful_results.append(failed_result)
                 else:
                     successful_results.append(result)
@@ -177,8 +362,10 @@ class BatchProcessor:
             job.progress_percentage = 100.0
             job.status = BatchStatus.COMPLETED
             job.completed_at = datetime.now()
-            
-            duration = (job.completed_at - job.started_at).total_seconds()
+            job.completed_monotonic = time.monotonic()
+            job.status_version += 1
+
+            duration = job.completed_monotonic - job.started_monotonic
             
             self.logger.log_info(f"Batch processing completed", extra_data={
                 'batch_id': batch_id,
@@ -195,7 +382,8 @@ class BatchProcessor:
                 'successful_scenarios': job.completed_scenarios - failed_count,
                 'failed_scenarios': failed_count,
                 'duration_seconds': duration,
-                'results': successful_results
+                'results': successful_results,
+                'ndjson_path': ndjson_path
             }
             
         except Exception as e:
@@ -203,73 +391,124 @@ class BatchProcessor:
             job.status = BatchStatus.FAILED
             job.error_message = str(e)
             job.completed_at = datetime.now()
+            job.completed_monotonic = time.monotonic()
+            job.status_version += 1
             
             self.logger.log_error(f"Batch processing failed", exception=e, extra_data={'batch_id': batch_id})
-            
+
             raise e
-    
-    async def _process_single_scenario(self, scenario: Dict[str, Any], scenario_index: int, 
-                                     batch_id: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
-        """Process a single scenario with conversation and evaluation"""
-        
-        async with self.semaphore:  # Limit concurrency
-            try:
+        finally:
+            if ndjson_writer is not None:
+                ndjson_queue.put(None)
+                ndjson_writer.join()
+
+    async def _run_conversation_stage(self, scenario: Dict[str, Any], scenario_index: int,
+                                      batch_id: str, scenario_name: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Run the conversation stage for a single scenario
+
+        Returns ('done', result) when no evaluation is needed (cache hit or
+        failed conversation), or ('evaluate', pending) with the transcript
+        payload for the evaluator pool.
+        """
+        try:
+            if scenario_name is None:
                 scenario_name = scenario.get('name', f'scenario_{scenario_index}')
-                
-                self.logger.log_info(f"Processing scenario {scenario_index}: {scenario_name}", extra_data={'batch_id': batch_id})
-                
-                # Run conversation
-                conversation_result = await self.conversation_engine.run_conversation(scenario)
-                
-                # Evaluate conversation if successful
-                if conversation_result.get('status') == 'completed':
-                    evaluation_result = await self.evaluator.evaluate_conversation(conversation_result)
-                    
-                    # Combine results
-                    combined_result = {
-                        'scenario_index': scenario_index,
-                        'scenario': scenario_name,
-                        'session_id': conversation_result.get('session_id'),
-                        'status': 'completed',
-                        'total_turns': conversation_result.get('total_turns'),
-                        'duration_seconds': conversation_result.get('duration_seconds'),
-                        'score': evaluation_result.get('score'),
-                        'comment': evaluation_result.get('comment'),
-                        'evaluation_status': evaluation_result.get('evaluation_status'),
-                        'start_time': conversation_result.get('start_time'),
-                        'end_time': conversation_result.get('end_time')
-                    }
-                else:
-                    # Conversation failed
-                    combined_result = {
-                        'scenario_index': scenario_index,
-                        'scenario': scenario_name,
-                        'session_id': conversation_result.get('session_id'),
-                        'status': 'failed',
-                        'error': conversation_result.get('error'),
-                        'total_turns': conversation_result.get('total_turns', 0),
-                        'score': 1,
-                        'comment': f"Разговор не завершен: {conversation_result.get('error', 'неизвестная ошибка')}"
-                    }
-                
-                # Update progress
-                if progress_callback:
-                    if asyncio.iscoroutinefunction(progress_callback):
-                        await progress_callback(batch_id, scenario_index + 1)
-                    else:
-                        progress_callback(batch_id, scenario_index + 1)
-                
-                self.logger.log_info(f"Completed scenario {scenario_index}: {scenario_name}", extra_data={
-                    'batch_id': batch_id,
-                    'score': combined_result.get('score'),
-                    'status': combined_result.get('status')
-                })
-                
-                return combined_result
-                
-            except Exception as e:
-                self.logger.log_error(f"Failed to process scenario {scenario_index}", exception=e, extra_data={'batch_id': batch_id})
-                raise e
+
+            self.logger.log_info(f"Processing scenario {scenario_index}: {scenario_name}", extra_data={'batch_id': batch_id})
+
+            # Check the result cache before spending any OpenAI calls
+            cache_key = None
+            if self.result_cache:
+                cache_key = self.result_cache.make_key(scenario, self.openai_wrapper.model)
+                cached_result = self.result_cache.get(cache_key)
+                if cached_result is not None:
+                    cached_result['scenario_index'] = scenario_index
+                    self.logger.log_info(f"Cache hit for scenario {scenario_index}: {scenario_name}", extra_data={
+                        'batch_id': batch_id,
+                        'cache_key': cache_key
+                    })
+                    return 'done', cached_result
+
+            # Run conversation
+            conversation_result = await self.conversation_engine.run_conversation(scenario)
+
+            # Bind repeated lookups once; each .get() is a hash + dispatch
+            conversation_status = conversation_result.get('status')
+            session_id = conversation_result.get('session_id')
+
+            if conversation_status == 'completed':
+                return 'evaluate', {
+                    'scenario_index': scenario_index,
+                    'scenario_name': scenario_name,
+                    'cache_key': cache_key,
+                    'conversation_result': conversation_result
+                }
+
+            # Conversation failed
+            error = conversation_result.get('error')
+            combined_result = {
+                'scenario_index': scenario_index,
+                'scenario': scenario_name,
+                'session_id': session_id,
+                'status': 'failed',
+                'error': error,
+                'total_turns': conversation_result.get('total_turns', 0),
+                'score': 1,
+                'comment': f"Разговор не завершен: {error or 'неизвестная ошибка'}"
+            }
+
+            self.logger.log_info(f"Completed scenario {scenario_index}: {scenario_name}", extra_data={
+                'batch_id': batch_id,
+                'score': combined_result.get('score'),
+                'status': combined_result.get('status')
+            })
+
+            return 'done', combined_result
+
+        except Exception as e:
+            self.logger.log_error(f"Failed to process scenario {scenario_index}", exception=e, extra_data={'batch_id': batch_id})
+            raise e
+
+    async def _evaluate_stage(self, pending: Dict[str, Any], batch_id: str) -> Dict[str, Any]:
+        """Evaluate a completed conversation and build the combined result"""
+
+        scenario_index = pending['scenario_index']
+        scenario_name = pending['scenario_name']
+        conversation_result = pending['conversation_result']
+
+        try:
+            evaluation_result = await self.evaluator.evaluate_conversation(conversation_result)
+
+            # Combine results
+            combined_result = {
+                'scenario_index': scenario_index,
+                'scenario': scenario_name,
+                'session_id': conversation_result.get('session_id'),
+                'status': 'completed',
+                'total_turns': conversation_result.get('total_turns'),
+                'duration_seconds': conversation_result.get('duration_seconds'),
+                'score': evaluation_result.get('score'),
+                'comment': evaluation_result.get('comment'),
+                'evaluation_status': evaluation_result.get('evaluation_status'),
+                'start_time': conversation_result.get('start_time'),
+                'end_time': conversation_result.get('end_time')
+            }
+
+            # Only successful runs are worth replaying from cache
+            if self.result_cache and pending['cache_key']:
+                self.result_cache.set(pending['cache_key'], combined_result)
+
+            self.logger.log_info(f"Completed scenario {scenario_index}: {scenario_name}", extra_data={
+                'batch_id': batch_id,
+                'score': combined_result.get('score'),
+                'status': combined_result.get('status')
+            })
+
+            return combined_result
+
+        except Exception as e:
+            self.logger.log_error(f"Failed to evaluate scenario {scenario_index}", exception=e, extra_data={'batch_id': batch_id})
+            raise e
     
     async def _update_progress(self, batch_id: str, completed_count: int):
         """Update batch job progress"""
@@ -277,6 +516,7 @@ class BatchProcessor:
             job = self.active_jobs[batch_id]
             job.completed_scenarios = completed_count
             job.progress_percentage = (completed_count / job.total_scenarios) * 100.0
+            job.status_version += 1
     
     def cancel_batch(self, batch_id: str) -> bool:
         """Cancel a running batch job"""
@@ -287,6 +527,8 @@ class BatchProcessor:
         if job.status == BatchStatus.RUNNING:
             job.status = BatchStatus.CANCELLED
             job.completed_at = datetime.now()
+            job.completed_monotonic = time.monotonic()
+            job.status_version += 1
             self.logger.log_info(f"Cancelled batch job", extra_data={'batch_id': batch_id})
             return True
         
@@ -294,12 +536,12 @@ class BatchProcessor:
     
     def cleanup_completed_jobs(self, max_age_hours: int = 24):
         """Clean up old completed jobs"""
-        current_time = datetime.now()
+        current_monotonic = time.monotonic()
         jobs_to_remove = []
-        
+
         for batch_id, job in self.active_jobs.items():
             if job.status in [BatchStatus.COMPLETED, BatchStatus.FAILED, BatchStatus.CANCELLED]:
-                if job.completed_at and (current_time - job.completed_at).total_seconds() > max_age_hours * 3600:
+                if job.completed_monotonic and current_monotonic - job.completed_monotonic > max_age_hours * 3600:
                     jobs_to_remove.append(batch_id)
         
         for batch_id in jobs_to_remove:
@@ -17,9 +17,42 @@ class Config:
     
     # Conversation Configuration
     MAX_TURNS: int = int(os.getenv('MAX_TURNS', '30'))
+    # Most recent turns kept in each side's message history; older middle
+    # turns are dropped so per-turn prompt tokens stay bounded
+    MAX_HISTORY_TURNS: int = int(os.getenv('MAX_HISTORY_TURNS', '20'))
     TIMEOUT_SEC: int = int(os.getenv('TIMEOUT_SEC', '90'))
     CONCURRENCY: int = int(os.getenv('CONCURRENCY', '4'))
+    # Worker count for the evaluation stage of the batch pipeline;
+    # 0 means derive from CONCURRENCY
+    EVAL_CONCURRENCY: int = int(os.getenv('EVAL_CONCURRENCY', '0'))
+    # Background threads available for running batch jobs; launches beyond
+    # this queue up instead of spawning unbounded threads
+    BATCH_WORKERS: int = int(os.getenv('BATCH_WORKERS', '4'))
+
+    # Provider rate limits enforced client-side (requests / tokens per minute)
+    OPENAI_RPM: int = int(os.getenv('OPENAI_RPM', '12000'))
+    OPENAI_TPM: int = int(os.getenv('OPENAI_TPM', '2000000'))
+
+    # HTTP/2 multiplexing for OpenAI requests (requires httpx[http2])
+    HTTP2: bool = os.getenv('HTTP2', 'False').lower() == 'true'
+
+    # Hand result downloads to the reverse proxy via X-Accel-Redirect so
+    # the kernel streams the file instead of a Python worker. Requires an
+    # nginx internal location /_protected/results/ mapped to RESULTS_DIR
+    USE_XSENDFILE: bool = os.getenv('USE_XSENDFILE', 'False').lower() == 'true'
+
+    # Maximum finished batch jobs kept in memory before LRU eviction
+    MAX_ACTIVE_JOBS: int = int(os.getenv('MAX_ACTIVE_JOBS', '100'))
+
+    # Send per-session KV-cache hints (cache_salt/session_id) with each
+    # completion request. Only for vLLM/SGLang-style gateways that honor
+    # them; api.openai.com rejects unknown request fields
+    SESSION_CACHE_HINTS: bool = os.getenv('SESSION_CACHE_HINTS', 'False').lower() == 'true'
     
+    # Minimum level for the application log; WARNING in production skips
+    # per-request INFO formatting entirely
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO').upper()
+
     # Webhook Configuration
     WEBHOOK_URL: str = os.getenv('WEBHOOK_URL', '')  # Empty by default for local testing
     
@@ -2,7 +2,9 @@
 Core conversation engine for LLM simulation
 """
 import asyncio
+import functools
 import json
+import re
 import time
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
@@ -10,7 +12,26 @@ from src.config import Config
 from src.openai_wrapper import OpenAIWrapper
 from src.webhook_manager import WebhookManager
 from src.tool_emulator import ToolEmulator
-from src.logging_utils import get_logger
+from src.logging_utils import get_logger, iso_now
+
+# Matches {placeholder} fields in prompt templates
+_PLACEHOLDER_PATTERN = re.compile(r'\{[A-Za-z_][A-Za-z0-9_]*\}')
+
+# End-of-call markers, compiled once; a single case-insensitive search
+# avoids lowercasing a copy of the response on every turn
+_AGENT_END_PATTERN = re.compile(r'end_call', re.IGNORECASE)
+_CLIENT_END_PATTERN = re.compile(r'до свидания|спасибо|всё|хватит|конец', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=32)
+def load_prompt_template(prompt_name: str) -> str:
+    """Read a prompt template from disk once per process
+
+    Engines are constructed per request/batch; caching here keeps
+    repeated construction from re-reading the same files. Raises on a
+    missing file so callers can apply their own fallback.
+    """
+    with open(Config.get_prompt_path(prompt_name), 'r', encoding='utf-8') as f:
+        return f.read()
 
 class ConversationEngine:
     """Core engine for managing conversations between Agent-LLM and Client-LLM"""
@@ -20,38 +41,71 @@ class ConversationEngine:
         self.webhook_manager = WebhookManager()
         self.tool_emulator = ToolEmulator()
         self.logger = get_logger()
+
+        # Bind config values once; avoids the Config class-attribute chain
+        # on every conversation
+        self.max_turns = Config.MAX_TURNS
+        self.timeout_sec = Config.TIMEOUT_SEC
+        self.max_history_turns = Config.MAX_HISTORY_TURNS
         
-        # Load prompt templates
+        # Load prompt templates once and split each into a static prefix and
+        # a dynamic tail. The prefix stays byte-identical across scenarios so
+        # provider prompt caching can hit on it; only the tail is formatted.
         self.agent_prompt = self._load_prompt_template("agent_system")
         self.client_prompt = self._load_prompt_template("client_system")
-    
+        self.agent_prompt_parts = self._split_prompt_template(self.agent_prompt)
+        self.client_prompt_parts = self._split_prompt_template(self.client_prompt)
+
     def _load_prompt_template(self, prompt_name: str) -> str:
         """Load prompt template from file"""
         try:
-            prompt_path = Config.get_prompt_path(prompt_name)
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return load_prompt_template(prompt_name)
         except Exception as e:
             self.logger.log_error(f"Failed to load prompt template: {prompt_name}", exception=e)
             return f"You are a {prompt_name.replace('_', ' ')}."
     
-    def _format_prompt(self, template: str, variables: Dict[str, Any], session_id: str) -> str:
-        """Format prompt template with variables"""
+    def _trim_history(self, messages: List[Dict[str, str]]) -> None:
+        """Cap a message list to the system prompt plus the most recent turns
+
+        Prompt tokens otherwise grow linearly with turn number, so each
+        request re-sends the entire dialog. Dropped middle messages are
+        replaced with a one-line marker so the model knows context was elided.
+        """
+        max_entries = 2 * self.max_history_turns
+        if len(messages) - 1 <= max_entries:
+            return
+
+        dropped = len(messages) - 1 - max_entries
+        marker = {"role": "system", "content": f"[история сокращена: пропущено {dropped} сообщений]"}
+        messages[1:] = [marker] + messages[-max_entries:]
+
+    def _split_prompt_template(self, template: str) -> Tuple[str, str]:
+        """Split a template at its first placeholder into (static prefix, dynamic tail)"""
+        match = _PLACEHOLDER_PATTERN.search(template)
+        if not match:
+            return template, ''
+        return template[:match.start()], template[match.start():]
+
+    def _format_prompt(self, template_parts: Tuple[str, str], variables: Dict[str, Any]) -> str:
+        """Format the dynamic tail of a prompt template; the prefix is reused as-is
+
+        The per-session id is deliberately not interpolated: it travels in the
+        first user message instead, so the rendered system prompt is identical
+        across sessions of the same scenario and prompt caching can hit on it.
+        """
+        prefix, suffix = template_parts
         try:
-            # Add session_id to variables
-            variables = variables.copy()
-            variables['session_id'] = session_id
-            
-            return template.format(**variables)
+            # format_map skips the **kwargs re-packing that .format() does
+            return prefix + suffix.format_map({**variables, 'session_id': '(см. первое сообщение)'})
         except KeyError as e:
             self.logger.log_error(f"Missing variable in prompt template: {e}")
-            return template
+            return prefix + suffix
     
     async def run_conversation(self, scenario: Dict[str, Any], max_turns: Optional[int] = None, timeout_sec: Optional[int] = None) -> Dict[str, Any]:
         """Run a complete conversation simulation"""
         
-        max_turns = max_turns or Config.MAX_TURNS
-        timeout_sec = timeout_sec or Config.TIMEOUT_SEC
+        max_turns = max_turns or self.max_turns
+        timeout_sec = timeout_sec or self.timeout_sec
         
         # Initialize session
         session_id = await self.webhook_manager.initialize_session()
@@ -70,15 +124,29 @@ class ConversationEngine:
         
         try:
             # Format system prompts
-            agent_system_prompt = self._format_prompt(self.agent_prompt, variables, session_id)
-            client_system_prompt = self._format_prompt(self.client_prompt, variables, session_id)
-            
+            agent_system_prompt = self._format_prompt(self.agent_prompt_parts, variables)
+            client_system_prompt = self._format_prompt(self.client_prompt_parts, variables)
+
+            # Per-session context rides in the first user message, keeping the
+            # system prompt byte-identical across sessions of a scenario
+            session_context = f"session_id={session_id}"
+
             # Initialize conversation history
-            agent_messages = [{"role": "system", "content": agent_system_prompt}]
-            client_messages = [{"role": "system", "content": client_system_prompt}]
-            
+            agent_messages = [
+                {"role": "system", "content": agent_system_prompt},
+                {"role": "user", "content": session_context}
+            ]
+            client_messages = [
+                {"role": "system", "content": client_system_prompt},
+                {"role": "user", "content": session_context}
+            ]
+
             # Start conversation with agent greeting
             agent_messages.append({"role": "user", "content": "Начните разговор с клиентом."})
+
+            # session_id and seed are fixed for the whole conversation, so
+            # bind them once instead of rebuilding the kwargs every turn
+            send = functools.partial(self.openai.chat_completion, session_id=session_id, seed=seed)
             
             conversation_history = []
             turn_number = 0
@@ -93,12 +161,27 @@ class ConversationEngine:
                 turn_number += 1
                 
                 # Agent turn
-                agent_response, agent_usage = await self.openai.chat_completion(
+                agent_response, agent_usage = await send(
                     messages=agent_messages,
-                    session_id=session_id,
-                    seed=seed
+                    stop_pattern=_AGENT_END_PATTERN
                 )
-                
+
+                # Check if agent wants to end call
+                end_call = _AGENT_END_PATTERN.search(agent_response) is not None
+
+                # Launch the client turn before the agent-turn bookkeeping, so
+                # logging and history appends overlap the request in flight
+                # Both sides record the agent turn as the same
+                # {"role": "assistant"} entry, so one shared dict serves both
+                client_task = None
+                agent_turn = {"role": "assistant", "content": agent_response}
+                if not end_call and turn_number < max_turns:
+                    client_messages.append(agent_turn)
+                    client_task = asyncio.ensure_future(send(
+                        messages=client_messages,
+                        stop_pattern=_CLIENT_END_PATTERN
+                    ))
+
                 # Log agent turn
                 self.logger.log_conversation_turn(
                     session_id=session_id,
@@ -106,32 +189,24 @@ class ConversationEngine:
                     role="agent",
                     content=agent_response
                 )
-                
+
                 conversation_history.append({
                     "turn": turn_number,
                     "speaker": "agent",
                     "content": agent_response,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": iso_now()
                 })
-                
-                # Check if agent wants to end call
-                if "end_call" in agent_response.lower():
+
+                if end_call:
                     self.logger.log_info(f"Agent ended call at turn {turn_number}", extra_data={'session_id': session_id})
                     break
-                
-                # Add agent response to client's context
-                client_messages.append({"role": "assistant", "content": agent_response})
-                
-                # Check if we've reached max turns
-                if turn_number >= max_turns:
+
+                # Reached max turns without a client turn pending
+                if client_task is None:
                     break
-                
+
                 # Client turn
-                client_response, client_usage = await self.openai.chat_completion(
-                    messages=client_messages,
-                    session_id=session_id,
-                    seed=seed
-                )
+                client_response, client_usage = await client_task
                 
                 # Log client turn
                 self.logger.log_conversation_turn(
@@ -145,18 +220,24 @@ class ConversationEngine:
                     "turn": turn_number,
                     "speaker": "client",
                     "content": client_response,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": iso_now()
                 })
                 
-                # Add client response to agent's context
-                agent_messages.append({"role": "assistant", "content": agent_response})
-                agent_messages.append({"role": "user", "content": client_response})
-                
-                # Add agent response to client's context for next turn
-                client_messages.append({"role": "user", "content": client_response})
+                # Add the exchange to both contexts; the client turn is the
+                # same {"role": "user"} entry in each
+                client_turn = {"role": "user", "content": client_response}
+                agent_messages.append(agent_turn)
+                agent_messages.append(client_turn)
+                client_messages.append(client_turn)
+
+                # Keep per-turn prompt size bounded
+                self._trim_history(agent_messages)
+                self._trim_history(client_messages)
                 
                 # Check if client wants to end conversation
-                if any(phrase in client_response.lower() for phrase in ["до свидания", "спасибо", "всё", "хватит", "конец"]):
+                # Farewell phrases come at the end of a reply, so scanning a
+                # bounded tail keeps detection O(1) on long responses
+                if _CLIENT_END_PATTERN.search(client_response[-200:]):
                     self.logger.log_info(f"Client ended conversation at turn {turn_number}", extra_data={'session_id': session_id})
                     break
             
@@ -193,7 +274,7 @@ class ConversationEngine:
                 'duration_seconds': time.time() - start_time,
                 'conversation_history': conversation_history if 'conversation_history' in locals() else [],
                 'start_time': datetime.fromtimestamp(start_time).isoformat(),
-                'end_time': datetime.now().isoformat()
+                'end_time': iso_now()
             }
     
     async def run_conversation_with_tools(self, scenario: Dict[str, Any], max_turns: Optional[int] = None, timeout_sec: Optional[int] = None) -> Dict[str, Any]:
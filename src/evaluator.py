@@ -1,28 +1,38 @@
 """
 Evaluator system for scoring conversations
 """
+import asyncio
+import functools
 import json
 from typing import Dict, List, Any, Tuple, Optional
+from pydantic import BaseModel, ValidationError
 from src.config import Config
 from src.openai_wrapper import OpenAIWrapper
+from src.conversation_engine import load_prompt_template
 from src.logging_utils import get_logger
 
+class _EvaluationResponse(BaseModel):
+    """Expected shape of an evaluator reply; validated in pydantic's compiled core"""
+    score: int
+    comment: str = ''
+
 class ConversationEvaluator:
     """Evaluates conversations and provides scores with comments"""
     
     def __init__(self, openai_wrapper: OpenAIWrapper):
         self.openai = openai_wrapper
         self.logger = get_logger()
-        
+
         # Load evaluator prompt template
         self.evaluator_prompt = self._load_evaluator_prompt()
+
+        # Lower temperature for more consistent evaluation, bound once
+        self._json_completion = functools.partial(openai_wrapper.json_completion, temperature=0.3)
     
     def _load_evaluator_prompt(self) -> str:
         """Load evaluator prompt template from file"""
         try:
-            prompt_path = Config.get_prompt_path("evaluator_system")
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return load_prompt_template("evaluator_system")
         except Exception as e:
             self.logger.log_error("Failed to load evaluator prompt template", exception=e)
             return """You are an expert evaluator of customer service conversations. 
@@ -66,10 +76,9 @@ class ConversationEvaluator:
             ]
             
             # Get evaluation from LLM with JSON format
-            evaluation_response, usage = await self.openai.json_completion(
+            evaluation_response, usage = await self._json_completion(
                 messages=messages,
-                session_id=session_id,
-                temperature=0.3  # Lower temperature for more consistent evaluation
+                session_id=session_id
             )
             
             # Parse and validate evaluation
@@ -119,56 +128,62 @@ class ConversationEvaluator:
             })
             return 1, "invalid evaluator output"
         
-        # Extract score and comment
-        score = response.get('score')
-        comment = response.get('comment', '')
-        
-        # Validate score
-        if not isinstance(score, int) or score not in [1, 2, 3]:
+        # Validate shape and types in one compiled pass
+        try:
+            parsed = _EvaluationResponse.model_validate(response, strict=True)
+            score, comment = parsed.score, parsed.comment
+        except ValidationError:
+            score = response.get('score')
+            comment_value = response.get('comment')
+            comment = str(comment_value) if comment_value else "Комментарий отсутствует"
+
+        if score not in (1, 2, 3):
             self.logger.log_error(f"Invalid score from evaluator: {score}", extra_data={'session_id': session_id})
             score = 1
             comment = f"Некорректная оценка от системы оценки. Оригинальный ответ: {comment}"
-        
-        # Validate comment
-        if not isinstance(comment, str):
-            comment = str(comment) if comment else "Комментарий отсутствует"
-        
+
         # Ensure comment is not empty
         if not comment.strip():
             comment = "Комментарий не предоставлен"
-        
+
         return score, comment
     
     async def batch_evaluate_conversations(self, conversations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Evaluate multiple conversations"""
         
         self.logger.log_info(f"Starting batch evaluation of {len(conversations)} conversations")
-        
+
+        # Evaluations are independent network calls, so fan out with a
+        # concurrency cap instead of awaiting them one by one
+        semaphore = asyncio.Semaphore(Config.CONCURRENCY)
+
+        async def evaluate_one(conversation: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.evaluate_conversation(conversation)
+
+        gathered = await asyncio.gather(
+            *[evaluate_one(conversation) for conversation in conversations],
+            return_exceptions=True
+        )
+
         evaluations = []
-        
-        for i, conversation in enumerate(conversations):
-            try:
-                evaluation = await self.evaluate_conversation(conversation)
-                evaluations.append(evaluation)
-                
-                self.logger.log_info(f"Completed evaluation {i+1}/{len(conversations)}", extra_data={
-                    'session_id': evaluation.get('session_id'),
-                    'score': evaluation.get('score')
-                })
-                
-            except Exception as e:
-                self.logger.log_error(f"Failed to evaluate conversation {i+1}", exception=e)
-                
+        for i, evaluation in enumerate(gathered):
+            if isinstance(evaluation, Exception):
+                self.logger.log_error(f"Failed to evaluate conversation {i+1}", exception=evaluation)
+
                 # Add failed evaluation
+                conversation = conversations[i]
                 evaluations.append({
                     'session_id': conversation.get('session_id', f'unknown_{i}'),
                     'scenario': conversation.get('scenario', 'unknown'),
                     'score': 1,
-                    'comment': f"Ошибка оценки: {str(e)}",
+                    'comment': f"Ошибка оценки: {str(evaluation)}",
                     'evaluation_status': 'failed',
-                    'error': str(e)
+                    'error': str(evaluation)
                 })
-        
+            else:
+                evaluations.append(evaluation)
+
         self.logger.log_info(f"Completed batch evaluation: {len(evaluations)} evaluations")
         return evaluations
     
@@ -183,19 +198,24 @@ class ConversationEvaluator:
                 'success_rate': 0
             }
         
-        scores = [eval_data.get('score', 1) for eval_data in evaluations]
-        successful_evaluations = [e for e in evaluations if e.get('evaluation_status') == 'success']
-        
+        # Single pass accumulating sum, distribution, and success count
+        score_sum = 0
+        successful_count = 0
         score_distribution = {1: 0, 2: 0, 3: 0}
-        for score in scores:
+        for eval_data in evaluations:
+            score = eval_data.get('score', 1)
+            score_sum += score
             if score in score_distribution:
                 score_distribution[score] += 1
-        
+            if eval_data.get('evaluation_status') == 'success':
+                successful_count += 1
+
+        total = len(evaluations)
         return {
-            'total_evaluations': len(evaluations),
-            'successful_evaluations': len(successful_evaluations),
-            'average_score': sum(scores) / len(scores) if scores else 0,
+            'total_evaluations': total,
+            'successful_evaluations': successful_count,
+            'average_score': score_sum / total,
             'score_distribution': score_distribution,
-            'success_rate': len(successful_evaluations) / len(evaluations) if evaluations else 0
+            'success_rate': successful_count / total
         }
 
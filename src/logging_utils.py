@@ -1,27 +1,67 @@
 """
 Logging infrastructure for LLM Simulation Service
 """
+import hashlib
 import logging
+import logging.handlers
 import os
-import json
+import queue
+import threading
+import time
+import orjson
 from datetime import datetime
 from typing import Dict, Any, Optional
 from src.config import Config
 
+def _dumps(data: Any) -> str:
+    """Serialize log payloads with orjson; unsupported types become strings"""
+    return orjson.dumps(data, default=str).decode()
+
+# strftime result cached per wall-clock second; only the microsecond
+# suffix is recomputed on each call
+_iso_cache_sec: int = -1
+_iso_cache_val: str = ''
+
+def iso_now() -> str:
+    """ISO-8601 local timestamp, cheaper than datetime.now().isoformat()"""
+    global _iso_cache_sec, _iso_cache_val
+    now = time.time()
+    sec = int(now)
+    if sec != _iso_cache_sec:
+        _iso_cache_val = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(sec))
+        _iso_cache_sec = sec
+    return f"{_iso_cache_val}.{int((now - sec) * 1e6):06d}"
+
+class _ExtraDataFormatter(logging.Formatter):
+    """Appends the record's extra_data payload as JSON, serialized lazily
+
+    Records carry extra_data as a plain attribute; it is only dumped here,
+    on the listener thread, instead of on the event loop at call time.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        formatted = super().format(record)
+        extra_data = getattr(record, 'extra_data', None)
+        if extra_data:
+            formatted = f"{formatted} - {_dumps(extra_data)}"
+        return formatted
+
 class SimulationLogger:
     """Custom logger for simulation service"""
     
     def __init__(self, batch_id: Optional[str] = None):
         self.batch_id = batch_id
+        self.listener: Optional[logging.handlers.QueueListener] = None
         self.setup_loggers()
-    
+
     def setup_loggers(self):
         """Setup different loggers for different purposes"""
         Config.ensure_directories()
         
-        # Main application logger
+        # Main application logger; level comes from config so production
+        # can run at WARNING and skip per-request INFO formatting
         self.app_logger = logging.getLogger('simulation_app')
-        self.app_logger.setLevel(logging.INFO)
+        self.app_logger.setLevel(Config.LOG_LEVEL)
         
         # Error logger
         self.error_logger = logging.getLogger('simulation_error')
@@ -31,10 +71,6 @@ class SimulationLogger:
         self.token_logger = logging.getLogger('simulation_tokens')
         self.token_logger.setLevel(logging.INFO)
         
-        # Conversation logger (detailed JSON logs)
-        self.conversation_logger = logging.getLogger('simulation_conversations')
-        self.conversation_logger.setLevel(logging.INFO)
-        
         # Setup file handlers
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         batch_suffix = f"_{self.batch_id}" if self.batch_id else ""
@@ -43,7 +79,7 @@ class SimulationLogger:
         app_handler = logging.FileHandler(
             os.path.join(Config.LOGS_DIR, f'app_{timestamp}{batch_suffix}.log')
         )
-        app_handler.setFormatter(logging.Formatter(
+        app_handler.setFormatter(_ExtraDataFormatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         ))
         self.app_logger.addHandler(app_handler)
@@ -52,7 +88,7 @@ class SimulationLogger:
         error_handler = logging.FileHandler(
             os.path.join(Config.LOGS_DIR, f'error_{timestamp}{batch_suffix}.log')
         )
-        error_handler.setFormatter(logging.Formatter(
+        error_handler.setFormatter(_ExtraDataFormatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         ))
         self.error_logger.addHandler(error_handler)
@@ -66,27 +102,79 @@ class SimulationLogger:
         ))
         self.token_logger.addHandler(token_handler)
         
-        # Conversation log handler (JSON format)
-        conversation_handler = logging.FileHandler(
-            os.path.join(Config.LOGS_DIR, f'conversations_{timestamp}{batch_suffix}.jsonl')
+        # Conversation events bypass the logging machinery entirely: they
+        # are already pure JSON, so a record/formatter round-trip per line
+        # buys nothing. Serialized orjson bytes are handed to a writer
+        # thread that appends them through a buffered binary stream.
+        self._conv_file = open(
+            os.path.join(Config.LOGS_DIR, f'conversations_{timestamp}{batch_suffix}.jsonl'),
+            'ab', buffering=1 << 16
         )
-        conversation_handler.setFormatter(logging.Formatter('%(message)s'))
-        self.conversation_logger.addHandler(conversation_handler)
-    
+        self._conv_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._seen_content_hashes: set = set()
+        self._conv_writer = threading.Thread(target=self._drain_conversation_queue, daemon=True)
+        self._conv_writer.start()
+
+        # Route every logger through a queue so file writes happen on a
+        # background listener thread instead of inside the event loop
+        log_queue: queue.Queue = queue.Queue(-1)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        route = {
+            self.app_logger: app_handler,
+            self.error_logger: error_handler,
+            self.token_logger: token_handler
+        }
+        for logger, handler in route.items():
+            # Clear handlers from any previous setup so records are not
+            # written twice when the logger is rebuilt for a new batch
+            logger.handlers.clear()
+            logger.addHandler(queue_handler)
+            # Tag each file handler with its logger name so the shared
+            # listener can route records back to the right file
+            handler.addFilter(lambda record, name=logger.name: record.name == name)
+
+        self.listener = logging.handlers.QueueListener(
+            log_queue, *route.values(), respect_handler_level=True
+        )
+        self.listener.start()
+
+    def _drain_conversation_queue(self):
+        """Writer-thread loop appending conversation events; None stops it"""
+        while True:
+            line = self._conv_queue.get()
+            if line is None:
+                break
+            self._conv_file.write(line)
+        self._conv_file.close()
+
+    def close(self):
+        """Flush queued records and stop the background writer threads"""
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+            self._conv_queue.put(None)
+            self._conv_writer.join()
+
+    def info_enabled(self) -> bool:
+        """Whether INFO records will be emitted
+
+        Hot call sites check this before building extra_data dicts and
+        f-strings, so discarded log calls cost one branch.
+        """
+        return self.app_logger.isEnabledFor(logging.INFO)
+
     def log_info(self, message: str, extra_data: Optional[Dict[str, Any]] = None):
         """Log info message"""
-        if extra_data:
-            message = f"{message} - {json.dumps(extra_data)}"
-        self.app_logger.info(message)
-    
+        self.app_logger.info(message, extra={'extra_data': extra_data})
+
     def log_error(self, message: str, exception: Optional[Exception] = None, extra_data: Optional[Dict[str, Any]] = None):
         """Log error message"""
-        if extra_data:
-            message = f"{message} - {json.dumps(extra_data)}"
         if exception:
-            self.error_logger.error(message, exc_info=exception)
+            self.error_logger.error(message, exc_info=exception, extra={'extra_data': extra_data})
         else:
-            self.error_logger.error(message)
+            self.error_logger.error(message, extra={'extra_data': extra_data})
     
     def log_token_usage(self, session_id: str, model: str, prompt_tokens: int, completion_tokens: int, total_tokens: int, cost_estimate: float = 0.0):
         """Log token usage for cost tracking"""
@@ -97,22 +185,29 @@ class SimulationLogger:
             'completion_tokens': completion_tokens,
             'total_tokens': total_tokens,
             'cost_estimate': cost_estimate,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }
-        self.token_logger.info(json.dumps(token_data))
+        self.token_logger.info(_dumps(token_data))
     
     def log_conversation_turn(self, session_id: str, turn_number: int, role: str, content: str, tool_calls: Optional[list] = None, tool_results: Optional[list] = None):
-        """Log detailed conversation turn"""
+        """Log detailed conversation turn
+
+        Identical content (repeated greetings, canned fallbacks) is written
+        in full only on first occurrence; later turns carry just its hash.
+        """
+        content_hash = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
         turn_data = {
             'session_id': session_id,
             'turn_number': turn_number,
             'role': role,
-            'content': content,
+            'content': None if content_hash in self._seen_content_hashes else content,
+            'content_hash': content_hash,
             'tool_calls': tool_calls,
             'tool_results': tool_results,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }
-        self.conversation_logger.info(json.dumps(turn_data))
+        self._seen_content_hashes.add(content_hash)
+        self._conv_queue.put(orjson.dumps(turn_data, default=str) + b'\n')
     
     def log_conversation_complete(self, session_id: str, total_turns: int, final_score: Optional[int] = None, evaluator_comment: Optional[str] = None, status: str = 'completed'):
         """Log conversation completion"""
@@ -122,10 +217,10 @@ class SimulationLogger:
             'final_score': final_score,
             'evaluator_comment': evaluator_comment,
             'status': status,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': iso_now(),
             'event_type': 'conversation_complete'
         }
-        self.conversation_logger.info(json.dumps(completion_data))
+        self._conv_queue.put(orjson.dumps(completion_data, default=str) + b'\n')
 
 # Global logger instance
 _global_logger: Optional[SimulationLogger] = None
@@ -134,6 +229,8 @@ def get_logger(batch_id: Optional[str] = None) -> SimulationLogger:
     """Get or create global logger instance"""
     global _global_logger
     if _global_logger is None or (batch_id and _global_logger.batch_id != batch_id):
+        if _global_logger is not None:
+            _global_logger.close()
         _global_logger = SimulationLogger(batch_id)
     return _global_logger
 
@@ -70,9 +70,13 @@ if __name__ == '__main__':
     print(f"OpenAI Model: {Config.OPENAI_MODEL}")
     print(f"Concurrency: {Config.CONCURRENCY}")
     
+    # threaded=True lets Werkzeug serve requests concurrently; the default
+    # handles one request at a time, so a slow results download would block
+    # every status poll. Docker runs gunicorn instead (see Dockerfile).
     app.run(
         host=Config.HOST,
         port=Config.PORT,
-        debug=Config.DEBUG
+        debug=Config.DEBUG,
+        threaded=True
     )
 
@@ -2,23 +2,100 @@
 OpenAI API wrapper with retry logic and rate limiting
 """
 import asyncio
-import json
+import re
 import time
 from typing import Dict, List, Optional, Any, Tuple
+import httpx
+import numpy as np
+import orjson
 from openai import AsyncOpenAI
-from asyncio_throttle import Throttler
-import random
 from src.config import Config
 from src.logging_utils import get_logger
 
+try:
+    import tiktoken
+except ImportError:  # optional; the byte-length heuristic is used instead
+    tiktoken = None
+
+# 4xx statuses that are still worth retrying
+_RETRIABLE_CLIENT_ERRORS = (408, 409, 425, 429)
+
+class _TokenBucket:
+    """Proactive request/token-per-minute limiter
+
+    Capacity refills continuously from the monotonic clock, so callers
+    wait out an over-budget window up front instead of firing the request
+    and burning a retry on the resulting 429. Meant for use from a single
+    event loop; state is only touched between awaits.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_capacity = float(rpm)
+        self.token_capacity = float(tpm)
+        self.last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.request_capacity = min(float(self.rpm), self.request_capacity + self.rpm * elapsed / 60.0)
+        self.token_capacity = min(float(self.tpm), self.token_capacity + self.tpm * elapsed / 60.0)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Block until one request and estimated_tokens fit in the budget"""
+        while True:
+            self._refill()
+            if self.request_capacity >= 1.0 and self.token_capacity >= estimated_tokens:
+                self.request_capacity -= 1.0
+                self.token_capacity -= estimated_tokens
+                return
+            await asyncio.sleep(0.05)
+
+    def record_actual(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the budget once the real usage is known"""
+        self.token_capacity -= actual_tokens - estimated_tokens
+
 class OpenAIWrapper:
     """Wrapper for OpenAI API with retry logic and rate limiting"""
     
     def __init__(self, api_key: str, model: str = None, max_retries: int = 3):
-        self.client = AsyncOpenAI(api_key=api_key)
+        # Size the connection pool for our concurrency instead of the httpx
+        # defaults (10 keepalive / 100 total), which churn connections when
+        # CONCURRENCY is raised. HTTP/2 multiplexes requests over one TLS
+        # connection when enabled via Config.HTTP2.
+        self._http = httpx.AsyncClient(
+            http2=Config.HTTP2,
+            limits=httpx.Limits(
+                max_keepalive_connections=Config.CONCURRENCY * 2,
+                max_connections=Config.CONCURRENCY * 4,
+                keepalive_expiry=30.0
+            ),
+            timeout=httpx.Timeout(Config.TIMEOUT_SEC, connect=5.0)
+        )
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self._http)
         self.model = model or Config.OPENAI_MODEL
         self.max_retries = max_retries
-        self.throttler = Throttler(rate_limit=200, period=1)  # 200 requests per second
+        # Cap in-flight requests (agent + client turns can overlap, hence
+        # the factor of two) and pace against the provider's RPM/TPM budget
+        self._sem = asyncio.Semaphore(Config.CONCURRENCY * 2)
+        self._bucket = _TokenBucket(rpm=Config.OPENAI_RPM, tpm=Config.OPENAI_TPM)
+
+        # Pre-drawn backoff jitter: retry storms index into this pool
+        # instead of hitting an RNG per coroutine, and a recorded
+        # _jitter_idx makes a flaky run's exact delays reproducible
+        self._jitter_pool = np.random.default_rng().uniform(0.0, 1.0, size=65536).astype(np.float32)
+        self._jitter_idx = 0
+
+        # Local tokenizer for pre-charging the bucket with a real prompt
+        # count instead of a character heuristic
+        self._encoder = None
+        if tiktoken is not None:
+            try:
+                self._encoder = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                self._encoder = tiktoken.get_encoding('cl100k_base')
         self.logger = get_logger()
         
         # Token cost estimates (per 1K tokens) - approximate values
@@ -28,17 +105,65 @@ class OpenAIWrapper:
             'gpt-4': {'input': 0.03, 'output': 0.06},
             'gpt-3.5-turbo': {'input': 0.0015, 'output': 0.002}
         }
+
+        # Model is fixed per instance, so resolve its per-token rates once
+        costs = self.token_costs.get(self.model, {'input': 0.0, 'output': 0.0})
+        self._cost_per_input_token = costs['input'] / 1000.0
+        self._cost_per_output_token = costs['output'] / 1000.0
     
-    async def _make_request_with_retry(self, messages: List[Dict[str, str]], 
-                                     session_id: str, 
+    async def _consume_stream(self, request_params: Dict[str, Any],
+                              stop_pattern: re.Pattern) -> Tuple[str, Dict[str, int]]:
+        """Stream a completion, aborting generation once stop_pattern appears
+
+        Closing the stream early cancels the rest of the generation on the
+        server, so turns that hit an end-of-call marker do not pay for the
+        tail tokens. Usage stays zeroed when the stream is cut short,
+        because the final usage chunk never arrives.
+        """
+        request_params = {**request_params, 'stream': True,
+                          'stream_options': {'include_usage': True}}
+        parts: List[str] = []
+        window = ''
+        usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+
+        stream = await self.client.chat.completions.create(**request_params)
+        async with stream:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = {
+                        'prompt_tokens': chunk.usage.prompt_tokens,
+                        'completion_tokens': chunk.usage.completion_tokens,
+                        'total_tokens': chunk.usage.total_tokens
+                    }
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    # Bounded rolling window so marker detection stays O(1)
+                    # per chunk and still catches matches across boundaries
+                    window = (window + delta)[-256:]
+                    if stop_pattern.search(window):
+                        break
+
+        return ''.join(parts), usage
+
+    async def _make_request_with_retry(self, messages: List[Dict[str, str]],
+                                     session_id: str,
                                      temperature: float = 0.7,
                                      seed: Optional[int] = None,
-                                     response_format: Optional[Dict[str, str]] = None) -> Tuple[str, Dict[str, int]]:
+                                     response_format: Optional[Dict[str, str]] = None,
+                                     stop_pattern: Optional[re.Pattern] = None) -> Tuple[str, Dict[str, int]]:
         """Make OpenAI API request with retry logic"""
-        
+
+        # Pre-charge the bucket with a local estimate; corrected once the
+        # real usage is known
+        estimated_tokens = self._estimate_prompt_tokens(messages)
+
         for attempt in range(self.max_retries):
             try:
-                async with self.throttler:
+                async with self._sem:
+                    await self._bucket.acquire(estimated_tokens)
                     # Prepare request parameters
                     request_params = {
                         'model': self.model,
@@ -51,18 +176,30 @@ class OpenAIWrapper:
                     
                     if response_format:
                         request_params['response_format'] = response_format
+
+                    if Config.SESSION_CACHE_HINTS:
+                        # Lets prefix-caching inference servers pin this
+                        # session's KV cache so only the new turn is prefilled
+                        request_params['extra_body'] = {
+                            'session_id': session_id,
+                            'cache_salt': session_id
+                        }
                     
                     # Make the API call
-                    response = await self.client.chat.completions.create(**request_params)
-                    
-                    # Extract response data
-                    content = response.choices[0].message.content
-                    usage = {
-                        'prompt_tokens': response.usage.prompt_tokens,
-                        'completion_tokens': response.usage.completion_tokens,
-                        'total_tokens': response.usage.total_tokens
-                    }
+                    if stop_pattern is not None:
+                        content, usage = await self._consume_stream(request_params, stop_pattern)
+                    else:
+                        response = await self.client.chat.completions.create(**request_params)
+
+                        content = response.choices[0].message.content
+                        usage = {
+                            'prompt_tokens': response.usage.prompt_tokens,
+                            'completion_tokens': response.usage.completion_tokens,
+                            'total_tokens': response.usage.total_tokens
+                        }
                     
+                    self._bucket.record_actual(estimated_tokens, usage['total_tokens'])
+
                     # Calculate cost estimate
                     cost_estimate = self._calculate_cost(usage)
                     
@@ -85,36 +222,60 @@ class OpenAIWrapper:
                     extra_data={'session_id': session_id, 'model': self.model}
                 )
                 
+                # Re-raise non-retriable client errors (bad request, auth,
+                # not found, ...) immediately instead of sleeping on them
+                status_code = getattr(e, 'status_code', None)
+                if (status_code is not None and 400 <= status_code < 500
+                        and status_code not in _RETRIABLE_CLIENT_ERRORS):
+                    raise e
+
                 if attempt == self.max_retries - 1:
                     raise e
-                
-                # Exponential backoff with jitter
-                wait_time = (2 ** attempt) + random.uniform(0, 1)
+
+                # Full jitter: uniform over the whole backoff window, so
+                # coroutines that hit a shared 429 desynchronize instead of
+                # all waking within the same second
+                jitter = float(self._jitter_pool[self._jitter_idx & 65535])
+                self._jitter_idx += 1
+                wait_time = min(30.0, 0.5 * (2 ** attempt)) * jitter
                 await asyncio.sleep(wait_time)
         
         raise Exception(f"Failed to complete OpenAI request after {self.max_retries} attempts")
     
+    def _estimate_prompt_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Estimate prompt tokens locally before the request is sent"""
+        contents = [m.get('content') or '' for m in messages]
+        if self._encoder is not None:
+            token_count = sum(len(ids) for ids in self._encoder.encode_ordinary_batch(contents))
+        else:
+            # UTF-8 byte count / 4 tracks BPE output reasonably for both
+            # Latin (~4 chars/token, 1 byte each) and Cyrillic text
+            # (~2 chars/token, 2 bytes each)
+            token_count = sum(len(content.encode()) for content in contents) // 4
+        # Per-message framing overhead plus completion headroom
+        return token_count + 8 * len(messages) + 200
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections; call on application shutdown"""
+        await self._http.aclose()
+
     def _calculate_cost(self, usage: Dict[str, int]) -> float:
         """Calculate estimated cost based on token usage"""
-        if self.model not in self.token_costs:
-            return 0.0
-        
-        costs = self.token_costs[self.model]
-        input_cost = (usage['prompt_tokens'] / 1000) * costs['input']
-        output_cost = (usage['completion_tokens'] / 1000) * costs['output']
-        
-        return input_cost + output_cost
+        return (usage['prompt_tokens'] * self._cost_per_input_token
+                + usage['completion_tokens'] * self._cost_per_output_token)
     
-    async def chat_completion(self, messages: List[Dict[str, str]], 
+    async def chat_completion(self, messages: List[Dict[str, str]],
                             session_id: str,
                             temperature: float = 0.7,
-                            seed: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
-        """Standard chat completion"""
+                            seed: Optional[int] = None,
+                            stop_pattern: Optional[re.Pattern] = None) -> Tuple[str, Dict[str, int]]:
+        """Standard chat completion; streams and aborts early when stop_pattern is given"""
         return await self._make_request_with_retry(
             messages=messages,
             session_id=session_id,
             temperature=temperature,
-            seed=seed
+            seed=seed,
+            stop_pattern=stop_pattern
         )
     
     async def json_completion(self, messages: List[Dict[str, str]], 
@@ -131,9 +292,11 @@ class OpenAIWrapper:
         )
         
         try:
-            json_response = json.loads(content)
+            # orjson parses straight from the response text in C, matching
+            # the serializer used everywhere else in the service
+            json_response = orjson.loads(content)
             return json_response, usage
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             self.logger.log_error(
                 f"Failed to parse JSON response from OpenAI",
                 exception=e,
@@ -0,0 +1,66 @@
+"""
+Disk-backed cache for scenario simulation results
+"""
+import hashlib
+import os
+import orjson
+from typing import Dict, Any, Optional
+from src.config import Config
+from src.logging_utils import get_logger
+
+class ResultCache:
+    """Content-addressed cache of combined conversation + evaluation results
+
+    Keys are derived from the scenario content, the model name and the prompt
+    files, so a repeat batch run (CI regression, prompt tuning loop) with an
+    unchanged scenario skips both OpenAI calls entirely. Editing any prompt
+    file invalidates all previously cached results.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.logger = get_logger()
+        self.cache_dir = cache_dir or os.path.join(Config.RESULTS_DIR, '.cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._prompts_fingerprint = self._fingerprint_prompts()
+
+    def _fingerprint_prompts(self) -> bytes:
+        """Fingerprint prompt files so edits invalidate cached results"""
+        parts = []
+        try:
+            for name in sorted(os.listdir(Config.PROMPTS_DIR)):
+                path = os.path.join(Config.PROMPTS_DIR, name)
+                if os.path.isfile(path):
+                    parts.append(f"{name}:{os.path.getmtime(path)}")
+        except OSError:
+            pass
+        return '|'.join(parts).encode('utf-8')
+
+    def make_key(self, scenario: Dict[str, Any], model: str) -> str:
+        """Compute content-addressed key for a scenario + model combination"""
+        payload = orjson.dumps(scenario, option=orjson.OPT_SORT_KEYS)
+        digest = hashlib.blake2b(
+            payload + model.encode('utf-8') + self._prompts_fingerprint,
+            digest_size=16
+        )
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached result for key, or None on miss"""
+        filepath = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(filepath, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.log_error(f"Failed to read cached result", exception=e, extra_data={'key': key})
+            return None
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result under key; failures are logged, never raised"""
+        filepath = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(result))
+        except Exception as e:
+            self.logger.log_error(f"Failed to write cached result", exception=e, extra_data={'key': key})
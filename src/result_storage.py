@@ -1,15 +1,47 @@
 """
 Result storage and reporting system
 """
-import json
 import csv
+import functools
+import mmap
 import os
-from typing import Dict, List, Any, Optional
+import orjson
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-import pandas as pd
+import numpy as np
 from src.config import Config
 from src.logging_utils import get_logger
 
+# CSV columns restored to numbers when loading (csv reads everything as str)
+_NUMERIC_CSV_FIELDS = ('score', 'turns', 'total_turns', 'duration_seconds')
+
+# Replaces newlines in comments in one pass instead of two str.replace scans
+_NEWLINE_TABLE = str.maketrans({'\n': ' ', '\r': ' '})
+
+@functools.lru_cache(maxsize=128)
+def _scan_results_by_ext(batch_id: str, dir_mtime_ns: int) -> Dict[str, List[str]]:
+    """Scan the results directory once for a batch, grouped by extension
+
+    Keyed on the directory's mtime so the cache invalidates itself as
+    soon as a new file lands; until then repeated download requests for
+    the same batch cost a dict lookup instead of a directory scan.
+    """
+    groups: Dict[str, List[str]] = {'csv': [], 'ndjson': [], 'json': []}
+    entries = []
+    with os.scandir(Config.RESULTS_DIR) as it:
+        for entry in it:
+            if batch_id not in entry.name or not entry.is_file():
+                continue
+            ext = entry.name.rsplit('.', 1)[-1]
+            if ext in groups:
+                entries.append((entry.stat().st_ctime, ext, entry.path))
+    # Newest first, matching list_result_files ordering
+    entries.sort(reverse=True)
+    for _, ext, path in entries:
+        groups[ext].append(path)
+    return groups
+
 class ResultStorage:
     """Handles storage and export of simulation results"""
     
@@ -19,21 +51,29 @@ class ResultStorage:
     
     def save_batch_results_ndjson(self, batch_id: str, results: List[Dict[str, Any]]) -> str:
         """Save batch results in NDJSON format"""
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"batch_{batch_id}_{timestamp}.ndjson"
+
+        # Nothing to export: skip the filesystem entirely rather than
+        # leaving a zero-byte file for list_result_files to scan
+        if not results:
+            self.logger.log_info(f"No results to export, skipping NDJSON", extra_data={'batch_id': batch_id})
+            return ''
+
+        # Read the clock once; the filename stamp and per-row export
+        # timestamp come from the same instant
+        now = datetime.now()
+        filename = f"batch_{batch_id}_{now.strftime('%Y%m%d_%H%M%S')}.ndjson"
         filepath = os.path.join(Config.RESULTS_DIR, filename)
-        
+
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
+            # One timestamp for the whole export, orjson straight to bytes,
+            # and a 128 KiB buffer so rows reach the disk in large chunks
+            export_timestamp = now.isoformat()
+            with open(filepath, 'wb', buffering=1 << 17) as f:
                 for result in results:
-                    # Add metadata
-                    result_with_metadata = {
-                        'batch_id': batch_id,
-                        'export_timestamp': datetime.now().isoformat(),
-                        **result
-                    }
-                    f.write(json.dumps(result_with_metadata, ensure_ascii=False) + '\n')
+                    f.write(orjson.dumps(
+                        {'batch_id': batch_id, 'export_timestamp': export_timestamp, **result},
+                        default=str
+                    ) + b'\n')
             
             self.logger.log_info(f"Saved NDJSON results", extra_data={
                 'batch_id': batch_id,
@@ -50,41 +90,41 @@ class ResultStorage:
     def save_batch_results_csv(self, batch_id: str, results: List[Dict[str, Any]], 
                               prompt_version: str = "default") -> str:
         """Save batch results in CSV format as specified in PRD"""
-        
+
+        if not results:
+            self.logger.log_info(f"No results to export, skipping CSV", extra_data={'batch_id': batch_id})
+            return ''
+
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"batch_{batch_id}_{timestamp}.csv"
         filepath = os.path.join(Config.RESULTS_DIR, filename)
         
         try:
-            # Prepare CSV data according to PRD format:
+            # Write CSV rows in a single streaming pass according to PRD format:
             # session_id,scenario,prompt_version,score,comment,turns,start_ts
-            csv_data = []
-            
-            for result in results:
-                csv_row = {
-                    'session_id': result.get('session_id', ''),
-                    'scenario': result.get('scenario', ''),
-                    'prompt_version': prompt_version,
-                    'score': result.get('score', 1),
-                    'comment': result.get('comment', '').replace('\n', ' ').replace('\r', ' '),  # Clean newlines
-                    'turns': result.get('total_turns', 0),
-                    'start_ts': result.get('start_time', ''),
-                    'status': result.get('status', 'unknown'),
-                    'duration_seconds': result.get('duration_seconds', 0),
-                    'evaluation_status': result.get('evaluation_status', 'unknown')
-                }
-                csv_data.append(csv_row)
-            
-            # Write CSV file
-            if csv_data:
-                fieldnames = ['session_id', 'scenario', 'prompt_version', 'score', 'comment', 
-                            'turns', 'start_ts', 'status', 'duration_seconds', 'evaluation_status']
-                
-                with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(csv_data)
-            
+            fieldnames = ['session_id', 'scenario', 'prompt_version', 'score', 'comment',
+                        'turns', 'start_ts', 'status', 'duration_seconds', 'evaluation_status']
+
+            # Large write buffer keeps row writes off the syscall path;
+            # plain tuples through csv.writer skip DictWriter's per-row
+            # fieldname lookups
+            with open(filepath, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+                writer = csv.writer(f)
+                writer.writerow(fieldnames)
+                writer.writerows(
+                    (result.get('session_id', ''),
+                     result.get('scenario', ''),
+                     prompt_version,
+                     result.get('score', 1),
+                     result.get('comment', '').translate(_NEWLINE_TABLE),  # Clean newlines
+                     result.get('total_turns', 0),
+                     result.get('start_time', ''),
+                     result.get('status', 'unknown'),
+                     result.get('duration_seconds', 0),
+                     result.get('evaluation_status', 'unknown'))
+                    for result in results
+                )
+
             self.logger.log_info(f"Saved CSV results", extra_data={
                 'batch_id': batch_id,
                 'filepath': filepath,
@@ -109,99 +149,211 @@ class ResultStorage:
             }
         
         try:
-            # Convert to DataFrame for easier analysis
-            df = pd.DataFrame(results)
-            
-            # Basic statistics
-            total_scenarios = len(results)
-            successful_scenarios = len(df[df['status'] == 'completed'])
-            failed_scenarios = len(df[df['status'] == 'failed'])
-            
-            # Score statistics
-            scores = df['score'].dropna()
-            score_stats = {
-                'mean': float(scores.mean()) if len(scores) > 0 else 0,
-                'median': float(scores.median()) if len(scores) > 0 else 0,
-                'std': float(scores.std()) if len(scores) > 0 else 0,
-                'min': int(scores.min()) if len(scores) > 0 else 0,
-                'max': int(scores.max()) if len(scores) > 0 else 0
-            }
-            
-            # Score distribution
-            score_distribution = {
-                'score_1': int((scores == 1).sum()) if len(scores) > 0 else 0,
-                'score_2': int((scores == 2).sum()) if len(scores) > 0 else 0,
-                'score_3': int((scores == 3).sum()) if len(scores) > 0 else 0
-            }
-            
-            # Turn statistics
-            turns_column = 'total_turns' if 'total_turns' in df.columns else 'turns'
-            if turns_column in df.columns:
-                turns = df[turns_column].dropna()
-                turn_stats = {
-                    'mean': float(turns.mean()) if len(turns) > 0 else 0,
-                    'median': float(turns.median()) if len(turns) > 0 else 0,
-                    'min': int(turns.min()) if len(turns) > 0 else 0,
-                    'max': int(turns.max()) if len(turns) > 0 else 0
-                }
-            else:
-                turn_stats = {
-                    'mean': 0, 'median': 0, 'min': 0, 'max': 0
-                }
-            
-            # Duration statistics
-            durations = df['duration_seconds'].dropna()
-            duration_stats = {
-                'mean': float(durations.mean()) if len(durations) > 0 else 0,
-                'median': float(durations.median()) if len(durations) > 0 else 0,
-                'min': float(durations.min()) if len(durations) > 0 else 0,
-                'max': float(durations.max()) if len(durations) > 0 else 0,
-                'total': float(durations.sum()) if len(durations) > 0 else 0
-            }
-            
-            # Scenario performance
-            agg_dict = {
-                'score': ['mean', 'count'],
-                'duration_seconds': 'mean'
+            # One pass over the results fills contiguous float arrays for
+            # the global statistics and a per-scenario accumulator, instead
+            # of building a DataFrame and re-scanning it per aggregate
+            state = self._new_summary_state(len(results))
+            for i, result in enumerate(results):
+                self._accumulate_result(i, result, state)
+
+            return self._finalize_summary(batch_id, state)
+
+        except Exception as e:
+            self.logger.log_error(f"Failed to generate summary report", exception=e, extra_data={'batch_id': batch_id})
+            raise e
+
+    @staticmethod
+    def _new_summary_state(total_scenarios: int) -> Dict[str, Any]:
+        """Fresh accumulators for a single-pass summary over a result list"""
+        return {
+            'total': total_scenarios,
+            'successful': 0,
+            'failed': 0,
+            'has_total_turns': False,
+            'scores': np.full(total_scenarios, np.nan, dtype=np.float32),
+            'turns': np.full(total_scenarios, np.nan, dtype=np.float32),
+            'durations': np.full(total_scenarios, np.nan, dtype=np.float32),
+            # scenario -> [score_sum, score_count, duration_sum, duration_count, turn_sum, turn_count];
+            # defaultdict only builds the zero row on a miss, where
+            # setdefault would allocate a fresh list per result
+            'scenario_acc': defaultdict(lambda: [0.0, 0, 0.0, 0, 0.0, 0])
+        }
+
+    @staticmethod
+    def _accumulate_result(i: int, result: Dict[str, Any], state: Dict[str, Any]) -> None:
+        """Fold one result row into the summary accumulators"""
+        status = result.get('status')
+        if status == 'completed':
+            state['successful'] += 1
+        elif status == 'failed':
+            state['failed'] += 1
+
+        score = result.get('score')
+        duration = result.get('duration_seconds')
+        if 'total_turns' in result:
+            state['has_total_turns'] = True
+            turn_count = result['total_turns']
+        else:
+            turn_count = result.get('turns')
+
+        acc = state['scenario_acc'][result.get('scenario')]
+        if score is not None:
+            state['scores'][i] = score
+            acc[0] += score
+            acc[1] += 1
+        if duration is not None:
+            state['durations'][i] = duration
+            acc[2] += duration
+            acc[3] += 1
+        if turn_count is not None:
+            state['turns'][i] = turn_count
+            acc[4] += turn_count
+            acc[5] += 1
+
+    def _finalize_summary(self, batch_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn the accumulators into the summary report dict"""
+        total_scenarios = state['total']
+        successful_scenarios = state['successful']
+        failed_scenarios = state['failed']
+        has_total_turns = state['has_total_turns']
+        scores = state['scores']
+        turns = state['turns']
+        durations = state['durations']
+        scenario_acc = state['scenario_acc']
+
+        valid_scores = scores[~np.isnan(scores)]
+        score_stats = {
+            'mean': float(valid_scores.mean()) if valid_scores.size else 0,
+            'median': float(np.median(valid_scores)) if valid_scores.size else 0,
+            'std': float(valid_scores.std(ddof=1)) if valid_scores.size > 1 else 0,
+            'min': int(valid_scores.min()) if valid_scores.size else 0,
+            'max': int(valid_scores.max()) if valid_scores.size else 0
+        }
+
+        score_distribution = {
+            f'score_{k}': int(np.count_nonzero(valid_scores == k)) for k in (1, 2, 3)
+        }
+
+        valid_turns = turns[~np.isnan(turns)]
+        turn_stats = {
+            'mean': float(valid_turns.mean()) if valid_turns.size else 0,
+            'median': float(np.median(valid_turns)) if valid_turns.size else 0,
+            'min': int(valid_turns.min()) if valid_turns.size else 0,
+            'max': int(valid_turns.max()) if valid_turns.size else 0
+        }
+
+        valid_durations = durations[~np.isnan(durations)]
+        duration_stats = {
+            'mean': float(valid_durations.mean()) if valid_durations.size else 0,
+            'median': float(np.median(valid_durations)) if valid_durations.size else 0,
+            'min': float(valid_durations.min()) if valid_durations.size else 0,
+            'max': float(valid_durations.max()) if valid_durations.size else 0,
+            'total': float(valid_durations.sum()) if valid_durations.size else 0
+        }
+
+        turns_key = 'total_turns' if has_total_turns else 'turns'
+        scenario_stats = {
+            scenario: {
+                'score_mean': round(acc[0] / acc[1], 2) if acc[1] else None,
+                'score_count': acc[1],
+                'duration_seconds_mean': round(acc[2] / acc[3], 2) if acc[3] else None,
+                f'{turns_key}_mean': round(acc[4] / acc[5], 2) if acc[5] else None
             }
-            if turns_column in df.columns:
-                agg_dict[turns_column] = 'mean'
-            
+            for scenario, acc in scenario_acc.items()
+        }
+        
+        summary = {
+            'batch_id': batch_id,
+            'total_scenarios': total_scenarios,
+            'successful_scenarios': successful_scenarios,
+            'failed_scenarios': failed_scenarios,
+            'success_rate': successful_scenarios / total_scenarios if total_scenarios > 0 else 0,
+            'score_statistics': score_stats,
+            'score_distribution': score_distribution,
+            'turn_statistics': turn_stats,
+            'duration_statistics': duration_stats,
+            'scenario_performance': scenario_stats,
+            'generated_at': datetime.now().isoformat()
+        }
+        
+        self.logger.log_info(f"Generated summary report", extra_data={
+            'batch_id': batch_id,
+            'total_scenarios': total_scenarios,
+            'mean_score': score_stats['mean']
+        })
+        
+        return summary
+
+    def write_batch(self, batch_id: str, results: List[Dict[str, Any]],
+                    prompt_version: str = "default",
+                    include_ndjson: bool = True) -> Tuple[str, str, Dict[str, Any]]:
+        """Write NDJSON + CSV exports and build the summary in one pass
+
+        The standalone save/summary methods each walk `results` on their
+        own; when all three outputs are wanted (the usual case at batch
+        completion) this fuses them into a single loop so the result
+        dicts are traversed once. Pass include_ndjson=False when the
+        NDJSON was already streamed to disk during the run.
+        """
+
+        if not results:
+            summary = self.generate_summary_report(batch_id, results)
+            return '', '', summary
+
+        now = datetime.now()
+        timestamp = now.strftime('%Y%m%d_%H%M%S')
+        ndjson_path = os.path.join(Config.RESULTS_DIR, f"batch_{batch_id}_{timestamp}.ndjson") if include_ndjson else ''
+        csv_path = os.path.join(Config.RESULTS_DIR, f"batch_{batch_id}_{timestamp}.csv")
+
+        try:
+            export_timestamp = now.isoformat()
+            fieldnames = ['session_id', 'scenario', 'prompt_version', 'score', 'comment',
+                        'turns', 'start_ts', 'status', 'duration_seconds', 'evaluation_status']
+            state = self._new_summary_state(len(results))
+
+            ndjson_f = open(ndjson_path, 'wb', buffering=1 << 17) if include_ndjson else None
             try:
-                scenario_stats_df = df.groupby('scenario').agg(agg_dict).round(2)
-                # Flatten multi-level columns
-                scenario_stats_df.columns = ['_'.join(col).strip() if isinstance(col, tuple) else col for col in scenario_stats_df.columns]
-                scenario_stats = scenario_stats_df.to_dict('index')
-            except Exception as e:
-                self.logger.log_error("Failed to calculate scenario performance", exception=e)
-                scenario_stats = {}
-            
-            summary = {
-                'batch_id': batch_id,
-                'total_scenarios': total_scenarios,
-                'successful_scenarios': successful_scenarios,
-                'failed_scenarios': failed_scenarios,
-                'success_rate': successful_scenarios / total_scenarios if total_scenarios > 0 else 0,
-                'score_statistics': score_stats,
-                'score_distribution': score_distribution,
-                'turn_statistics': turn_stats,
-                'duration_statistics': duration_stats,
-                'scenario_performance': scenario_stats,
-                'generated_at': datetime.now().isoformat()
-            }
-            
-            self.logger.log_info(f"Generated summary report", extra_data={
+                with open(csv_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csv_f:
+                    writer = csv.writer(csv_f)
+                    writer.writerow(fieldnames)
+                    for i, result in enumerate(results):
+                        if ndjson_f is not None:
+                            ndjson_f.write(orjson.dumps(
+                                {'batch_id': batch_id, 'export_timestamp': export_timestamp, **result},
+                                default=str
+                            ) + b'\n')
+                        writer.writerow(
+                            (result.get('session_id', ''),
+                             result.get('scenario', ''),
+                             prompt_version,
+                             result.get('score', 1),
+                             result.get('comment', '').translate(_NEWLINE_TABLE),
+                             result.get('total_turns', 0),
+                             result.get('start_time', ''),
+                             result.get('status', 'unknown'),
+                             result.get('duration_seconds', 0),
+                             result.get('evaluation_status', 'unknown'))
+                        )
+                        self._accumulate_result(i, result, state)
+            finally:
+                if ndjson_f is not None:
+                    ndjson_f.close()
+
+            summary = self._finalize_summary(batch_id, state)
+
+            self.logger.log_info(f"Saved batch exports", extra_data={
                 'batch_id': batch_id,
-                'total_scenarios': total_scenarios,
-                'mean_score': score_stats['mean']
+                'ndjson_path': ndjson_path,
+                'csv_path': csv_path,
+                'result_count': len(results)
             })
-            
-            return summary
-            
+
+            return ndjson_path, csv_path, summary
+
         except Exception as e:
-            self.logger.log_error(f"Failed to generate summary report", exception=e, extra_data={'batch_id': batch_id})
+            self.logger.log_error(f"Failed to write batch exports", exception=e, extra_data={'batch_id': batch_id})
             raise e
-    
+
     def save_summary_report(self, summary: Dict[str, Any]) -> str:
         """Save summary report to JSON file"""
         
@@ -211,8 +363,11 @@ class ResultStorage:
         filepath = os.path.join(Config.RESULTS_DIR, filename)
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, ensure_ascii=False, indent=2)
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(
+                    summary,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                ))
             
             self.logger.log_info(f"Saved summary report", extra_data={
                 'batch_id': batch_id,
@@ -230,17 +385,27 @@ class ResultStorage:
         
         try:
             if filepath.endswith('.ndjson'):
+                # Binary iteration splits lines in C and orjson decodes each
+                # bytes slice directly; the 1 MiB buffer keeps reads chunky
+                with open(filepath, 'rb', buffering=1 << 20) as f:
+                    return [orjson.loads(line) for line in f if line.strip()]
+
+            elif filepath.endswith('.csv'):
+                # Stream rows instead of a pandas round-trip, which peaks at
+                # several times the file size before to_dict('records')
                 results = []
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            results.append(json.loads(line))
+                with open(filepath, 'r', newline='', encoding='utf-8', buffering=1 << 17) as f:
+                    for row in csv.DictReader(f):
+                        for field in _NUMERIC_CSV_FIELDS:
+                            value = row.get(field)
+                            if value:
+                                try:
+                                    row[field] = float(value) if '.' in value else int(value)
+                                except ValueError:
+                                    pass
+                        results.append(row)
                 return results
-                
-            elif filepath.endswith('.csv'):
-                df = pd.read_csv(filepath)
-                return df.to_dict('records')
-                
+
             else:
                 raise ValueError(f"Unsupported file format: {filepath}")
                 
@@ -252,26 +417,45 @@ class ResultStorage:
         """Get cost estimate from token usage logs"""
         
         try:
-            # Read token usage logs
-            log_files = [f for f in os.listdir(Config.LOGS_DIR) if f.startswith('tokens_') and batch_id in f]
-            
+            # Read token usage logs; scandir avoids a stat per entry
+            with os.scandir(Config.LOGS_DIR) as it:
+                log_paths = [entry.path for entry in it
+                             if entry.name.startswith('tokens_') and batch_id in entry.name]
+
             total_cost = 0.0
             total_tokens = 0
             total_requests = 0
-            
-            for log_file in log_files:
-                log_path = os.path.join(Config.LOGS_DIR, log_file)
-                
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip():
-                            try:
-                                token_data = json.loads(line.split(' - ', 1)[1])  # Remove timestamp
-                                total_cost += token_data.get('cost_estimate', 0)
-                                total_tokens += token_data.get('total_tokens', 0)
-                                total_requests += 1
-                            except (json.JSONDecodeError, IndexError):
-                                continue
+
+            for log_path in log_paths:
+                if os.path.getsize(log_path) == 0:
+                    continue
+                # Scan the mapped bytes for the " - {" payload anchor and
+                # parse just that slice with orjson; nothing is decoded to
+                # str on the way through
+                with open(log_path, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                        # One front-to-back pass: tell the kernel to read
+                        # ahead aggressively and drop pages behind us
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    size = len(mm)
+                    start = 0
+                    while start < size:
+                        end = mm.find(b'\n', start)
+                        if end == -1:
+                            end = size
+                        line = mm[start:end]
+                        start = end + 1
+                        marker = line.find(b' - {')  # Skip the timestamp prefix
+                        if marker == -1:
+                            continue
+                        try:
+                            token_data = orjson.loads(line[marker + 3:])
+                        except orjson.JSONDecodeError:
+                            continue
+                        total_cost += token_data.get('cost_estimate', 0)
+                        total_tokens += token_data.get('total_tokens', 0)
+                        total_requests += 1
             
             cost_report = {
                 'batch_id': batch_id,
@@ -295,32 +479,41 @@ class ResultStorage:
                 'generated_at': datetime.now().isoformat()
             }
     
+    def files_by_ext(self, batch_id: str) -> Dict[str, List[str]]:
+        """Result file paths for a batch grouped by extension, newest first"""
+        try:
+            dir_mtime_ns = os.stat(Config.RESULTS_DIR).st_mtime_ns
+        except OSError:
+            return {'csv': [], 'ndjson': [], 'json': []}
+        return _scan_results_by_ext(batch_id, dir_mtime_ns)
+
     def list_result_files(self, batch_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """List available result files"""
         
         try:
-            files = []
-            
-            for filename in os.listdir(Config.RESULTS_DIR):
-                if batch_id and batch_id not in filename:
-                    continue
-                
-                filepath = os.path.join(Config.RESULTS_DIR, filename)
-                if os.path.isfile(filepath):
-                    stat = os.stat(filepath)
-                    
-                    files.append({
-                        'filename': filename,
-                        'filepath': filepath,
+            # DirEntry.stat() reuses data from the directory read, so the
+            # whole listing costs one getdents sweep instead of a stat per
+            # file; sort on the raw ctime float rather than ISO strings
+            entries = []
+            with os.scandir(Config.RESULTS_DIR) as it:
+                for entry in it:
+                    if batch_id and batch_id not in entry.name:
+                        continue
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_ctime, {
+                        'filename': entry.name,
+                        'filepath': entry.path,
                         'size_bytes': stat.st_size,
                         'created_at': datetime.fromtimestamp(stat.st_ctime).isoformat(),
                         'modified_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                    })
-            
+                    }))
+
             # Sort by creation time (newest first)
-            files.sort(key=lambda x: x['created_at'], reverse=True)
-            
-            return files
+            entries.sort(key=lambda item: item[0], reverse=True)
+
+            return [info for _, info in entries]
             
         except Exception as e:
             self.logger.log_error(f"Failed to list result files", exception=e)
@@ -2,8 +2,16 @@
 REST API routes for batch simulation service
 """
 import asyncio
+import atexit
+import gzip
 import os
-from flask import Blueprint, request, jsonify, send_file
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Any, Dict, List
+import orjson
+from flask import Blueprint, request, current_app, send_file
+from pydantic import BaseModel, Field, ValidationError
 from werkzeug.exceptions import BadRequest, NotFound
 from src.config import Config
 from src.batch_processor import BatchProcessor
@@ -13,18 +21,127 @@ from src.logging_utils import get_logger
 # Create blueprint for batch routes
 batch_bp = Blueprint('batch', __name__)
 
-# Global batch processor instance
+# Global batch processor instance; guarded by _init_lock on first use
 batch_processor = None
+_init_lock = threading.Lock()
 result_storage = ResultStorage()
 logger = get_logger()
 
+# One long-lived event loop on a daemon thread runs every batch. Keeping
+# the loop alive means the HTTP connection pools, DNS cache, and TLS
+# state inside the processor survive across jobs instead of being
+# rebuilt per launch
+_batch_loop = asyncio.new_event_loop()
+threading.Thread(target=_batch_loop.run_forever, name='batch-loop', daemon=True).start()
+
+# Bounded pool for blocking post-processing (result export) so file I/O
+# never stalls the shared loop; sized by BATCH_WORKERS
+_batch_executor = ThreadPoolExecutor(max_workers=Config.BATCH_WORKERS, thread_name_prefix='batch')
+atexit.register(_batch_executor.shutdown, wait=False)
+
+class _Scenario(BaseModel):
+    """Minimal per-scenario shape; extra keys pass through untouched"""
+    model_config = {'extra': 'allow'}
+    name: str
+    variables: Dict[str, Any]
+
+class _BatchRequest(BaseModel):
+    """Launch payload validated in pydantic's compiled core
+
+    One model_validate call replaces the Python-level loop over every
+    scenario, which was measurable ahead of large batch launches.
+    """
+    model_config = {'extra': 'allow'}
+    scenarios: List[_Scenario] = Field(min_length=1)
+
+def ojsonify(obj):
+    """jsonify drop-in that serializes with orjson straight to bytes
+
+    Skips Flask's stdlib-json path and the extra str-to-bytes encode;
+    on large results payloads serialization is the dominant handler cost.
+    """
+    return current_app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=str),
+        mimetype='application/json'
+    )
+
+def _file_download(filepath, download_name, mimetype):
+    """Serve a result file, delegating to the proxy when configured
+
+    With USE_XSENDFILE the handler returns immediately and nginx
+    sendfile()s the bytes to the client; otherwise the file streams
+    through send_file as before.
+    """
+    if Config.USE_XSENDFILE:
+        response = current_app.response_class(status=200, mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f'/_protected/results/{os.path.basename(filepath)}'
+        response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+        return response
+    return send_file(
+        filepath,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype
+    )
+
+def _etag_result(etag, build):
+    """Conditional-GET wrapper around ojsonify
+
+    Clients poll status/results every second; when the job's change
+    counter has not moved the handler answers 304 from the ETag alone,
+    skipping build() and serialization entirely.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    response = ojsonify(build())
+    response.set_etag(etag)
+    response.cache_control.max_age = 1
+    return response
+
+# Responses below this size are not worth the compression round-trip
+_COMPRESS_MIN_SIZE = 1024
+_COMPRESS_MIMETYPES = frozenset({'application/json', 'application/x-ndjson', 'text/csv'})
+
+@batch_bp.after_request
+def _compress_response(response):
+    """Gzip large JSON/CSV payloads when the client accepts it
+
+    Results and summaries are repetitive JSON with long text fields, so
+    level-5 gzip typically shrinks them several-fold for one cheap pass.
+    File downloads stream through untouched (direct_passthrough).
+    """
+    if (response.direct_passthrough
+            or response.status_code != 200
+            or response.mimetype not in _COMPRESS_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '')):
+        return response
+
+    data = response.get_data()
+    if len(data) < _COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers.add('Vary', 'Accept-Encoding')
+    return response
+
 def get_batch_processor():
-    """Get or create batch processor instance"""
+    """Get or create batch processor instance
+
+    Double-checked so two first requests on different WSGI threads
+    cannot race and build two processors (each with its own connection
+    pools); steady-state calls stay lock-free.
+    """
     global batch_processor
     if batch_processor is None:
-        # Validate configuration
-        Config.validate()
-        batch_processor = BatchProcessor(Config.OPENAI_API_KEY, Config.CONCURRENCY)
+        with _init_lock:
+            if batch_processor is None:
+                # Validate configuration
+                Config.validate()
+                batch_processor = BatchProcessor(Config.OPENAI_API_KEY, Config.CONCURRENCY)
     return batch_processor
 
 @batch_bp.route('/batches', methods=['POST'])
@@ -36,77 +153,73 @@ def launch_batch():
             raise BadRequest("Request must be JSON")
         
         data = request.get_json()
-        scenarios = data.get('scenarios', [])
-        
-        if not scenarios:
-            raise BadRequest("No scenarios provided")
-        
-        if not isinstance(scenarios, list):
-            raise BadRequest("Scenarios must be a list")
-        
-        # Validate scenarios
-        for i, scenario in enumerate(scenarios):
-            if not isinstance(scenario, dict):
-                raise BadRequest(f"Scenario {i} must be an object")
-            
-            if 'name' not in scenario:
-                raise BadRequest(f"Scenario {i} missing 'name' field")
-            
-            if 'variables' not in scenario:
-                raise BadRequest(f"Scenario {i} missing 'variables' field")
-        
+
+        # Validate the whole payload in one compiled pass; the original
+        # dicts (with any extra keys) are what the job actually stores
+        try:
+            _BatchRequest.model_validate(data)
+        except ValidationError as e:
+            first = e.errors(include_url=False)[0]
+            location = '.'.join(str(part) for part in first['loc'])
+            raise BadRequest(f"Invalid batch request at '{location}': {first['msg']}")
+
+        scenarios = data['scenarios']
+
         # Create batch job
         processor = get_batch_processor()
         batch_id = processor.create_batch_job(scenarios)
         
-        # Start batch processing in background
-        def run_batch_async():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        # Save results when batch completes; runs on the executor so the
+        # shared loop is free to drive other batches meanwhile
+        def save_results(result):
             try:
-                result = loop.run_until_complete(processor.run_batch(batch_id))
-                
-                # Save results when batch completes
                 if result.get('status') == 'completed':
                     results = result.get('results', [])
-                    
-                    # Save in both formats
-                    result_storage.save_batch_results_ndjson(batch_id, results)
-                    result_storage.save_batch_results_csv(batch_id, results)
-                    
-                    # Generate and save summary
-                    summary = result_storage.generate_summary_report(batch_id, results)
+
+                    # One fused pass writes CSV and the summary accumulators
+                    # together; NDJSON is skipped when it was already
+                    # streamed to disk during the run
+                    _, _, summary = result_storage.write_batch(
+                        batch_id, results,
+                        include_ndjson=not result.get('ndjson_path')
+                    )
                     result_storage.save_summary_report(summary)
-                    
+
                     logger.log_info(f"Batch {batch_id} completed and results saved")
-                
+
+            except Exception as e:
+                logger.log_error(f"Failed to save batch results", exception=e, extra_data={'batch_id': batch_id})
+
+        def on_batch_done(fut):
+            try:
+                result = fut.result()
             except Exception as e:
                 logger.log_error(f"Background batch processing failed", exception=e, extra_data={'batch_id': batch_id})
-            finally:
-                loop.close()
-        
-        # Start background thread
-        import threading
-        thread = threading.Thread(target=run_batch_async)
-        thread.daemon = True
-        thread.start()
+                return
+            _batch_executor.submit(save_results, result)
+
+        # Schedule the batch on the shared loop instead of building a
+        # loop per launch
+        future = asyncio.run_coroutine_threadsafe(processor.run_batch(batch_id), _batch_loop)
+        future.add_done_callback(on_batch_done)
         
-        logger.log_info(f"Launched batch job", extra_data={
-            'batch_id': batch_id,
-            'scenario_count': len(scenarios)
-        })
+        if logger.info_enabled():
+            logger.log_info(f"Launched batch job", extra_data={
+                'batch_id': batch_id,
+                'scenario_count': len(scenarios)
+            })
         
-        return jsonify({
+        return ojsonify({
             'batch_id': batch_id,
             'status': 'launched',
             'total_scenarios': len(scenarios)
         }), 201
         
     except BadRequest as e:
-        return jsonify({'error': str(e)}), 400
+        return ojsonify({'error': str(e)}), 400
     except Exception as e:
         logger.log_error("Failed to launch batch", exception=e)
-        return jsonify({'error': 'Internal server error'}), 500
+        return ojsonify({'error': 'Internal server error'}), 500
 
 @batch_bp.route('/batches/<batch_id>', methods=['GET'])
 def get_batch_status(batch_id: str):
@@ -117,14 +230,15 @@ def get_batch_status(batch_id: str):
         
         if status is None:
             raise NotFound(f"Batch {batch_id} not found")
-        
-        return jsonify(status), 200
-        
+
+        version = processor.get_status_version(batch_id)
+        return _etag_result(f'{batch_id}:{version}', lambda: status)
+
     except NotFound as e:
-        return jsonify({'error': str(e)}), 404
+        return ojsonify({'error': str(e)}), 404
     except Exception as e:
         logger.log_error("Failed to get batch status", exception=e, extra_data={'batch_id': batch_id})
-        return jsonify({'error': 'Internal server error'}), 500
+        return ojsonify({'error': 'Internal server error'}), 500
 
 @batch_bp.route('/batches/<batch_id>/results', methods=['GET'])
 def get_batch_results(batch_id: str):
@@ -139,7 +253,7 @@ def get_batch_results(batch_id: str):
         
         # Check if batch is completed
         if status['status'] != 'completed':
-            return jsonify({
+            return ojsonify({
                 'error': 'Batch not completed',
                 'current_status': status['status']
             }), 400
@@ -148,56 +262,41 @@ def get_batch_results(batch_id: str):
         format_type = request.args.get('format', 'json').lower()
         
         if format_type == 'csv':
-            # Find CSV file for this batch
-            result_files = result_storage.list_result_files(batch_id)
-            csv_files = [f for f in result_files if f['filename'].endswith('.csv')]
-            
+            # Cached per-batch listing; newest file first
+            csv_files = result_storage.files_by_ext(batch_id)['csv']
+
             if not csv_files:
-                return jsonify({'error': 'CSV results not found'}), 404
-            
-            # Return most recent CSV file
-            csv_file = csv_files[0]
-            return send_file(
-                csv_file['filepath'],
-                as_attachment=True,
-                download_name=f"batch_{batch_id}_results.csv",
-                mimetype='text/csv'
-            )
-            
+                return ojsonify({'error': 'CSV results not found'}), 404
+
+            return _file_download(csv_files[0], f"batch_{batch_id}_results.csv", 'text/csv')
+
         elif format_type == 'ndjson':
-            # Find NDJSON file for this batch
-            result_files = result_storage.list_result_files(batch_id)
-            ndjson_files = [f for f in result_files if f['filename'].endswith('.ndjson')]
-            
+            ndjson_files = result_storage.files_by_ext(batch_id)['ndjson']
+
             if not ndjson_files:
-                return jsonify({'error': 'NDJSON results not found'}), 404
-            
-            # Return most recent NDJSON file
-            ndjson_file = ndjson_files[0]
-            return send_file(
-                ndjson_file['filepath'],
-                as_attachment=True,
-                download_name=f"batch_{batch_id}_results.ndjson",
-                mimetype='application/x-ndjson'
-            )
+                return ojsonify({'error': 'NDJSON results not found'}), 404
+
+            return _file_download(ndjson_files[0], f"batch_{batch_id}_results.ndjson",
+                                  'application/x-ndjson')
             
         else:
             # Return JSON results directly
             results = processor.get_batch_results(batch_id)
             if results is None:
-                return jsonify({'error': 'Results not found'}), 404
-            
-            return jsonify({
+                return ojsonify({'error': 'Results not found'}), 404
+
+            version = processor.get_status_version(batch_id)
+            return _etag_result(f'{batch_id}:{version}:results', lambda: {
                 'batch_id': batch_id,
                 'results': results,
                 'total_results': len(results)
-            }), 200
+            })
         
     except NotFound as e:
-        return jsonify({'error': str(e)}), 404
+        return ojsonify({'error': str(e)}), 404
     except Exception as e:
         logger.log_error("Failed to get batch results", exception=e, extra_data={'batch_id': batch_id})
-        return jsonify({'error': 'Internal server error'}), 500
+        return ojsonify({'error': 'Internal server error'}), 500
 
 @batch_bp.route('/batches/<batch_id>/summary', methods=['GET'])
 def get_batch_summary(batch_id: str):
@@ -211,25 +310,26 @@ def get_batch_summary(batch_id: str):
             raise NotFound(f"Batch {batch_id} not found")
         
         if status['status'] != 'completed':
-            return jsonify({
+            return ojsonify({
                 'error': 'Batch not completed',
                 'current_status': status['status']
             }), 400
         
-        # Get results and generate summary
+        # Get results and generate summary; the lambda defers the summary
+        # computation so a 304 skips it entirely
         results = processor.get_batch_results(batch_id)
         if results is None:
-            return jsonify({'error': 'Results not found'}), 404
-        
-        summary = result_storage.generate_summary_report(batch_id, results)
-        
-        return jsonify(summary), 200
+            return ojsonify({'error': 'Results not found'}), 404
+
+        version = processor.get_status_version(batch_id)
+        return _etag_result(f'{batch_id}:{version}:summary',
+                            lambda: result_storage.generate_summary_report(batch_id, results))
         
     except NotFound as e:
-        return jsonify({'error': str(e)}), 404
+        return ojsonify({'error': str(e)}), 404
     except Exception as e:
         logger.log_error("Failed to get batch summary", exception=e, extra_data={'batch_id': batch_id})
-        return jsonify({'error': 'Internal server error'}), 500
+        return ojsonify({'error': 'Internal server error'}), 500
 
 @batch_bp.route('/batches/<batch_id>/cost', methods=['GET'])
 def get_batch_cost(batch_id: str):
@@ -244,38 +344,38 @@ def get_batch_cost(batch_id: str):
         
         cost_estimate = result_storage.get_cost_estimate(batch_id)
         
-        return jsonify(cost_estimate), 200
+        return ojsonify(cost_estimate), 200
         
     except NotFound as e:
-        return jsonify({'error': str(e)}), 404
+        return ojsonify({'error': str(e)}), 404
     except Exception as e:
         logger.log_error("Failed to get batch cost", exception=e, extra_data={'batch_id': batch_id})
-        return jsonify({'error': 'Internal server error'}), 500
+        return ojsonify({'error': 'Internal server error'}), 500
 
 @batch_bp.route('/batches', methods=['GET'])
 def list_batches():
     """List all batch jobs"""
     try:
         processor = get_batch_processor()
-        
-        # Get all active jobs
-        batches = []
-        for batch_id in processor.active_jobs:
-            status = processor.get_batch_status(batch_id)
-            if status:
-                batches.append(status)
-        
-        # Sort by creation time (newest first)
-        batches.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        return jsonify({
+
+        # One traversal instead of a get_batch_status call per id;
+        # sort newest first on the created_at string
+        batches = processor.get_all_statuses()
+        batches.sort(key=itemgetter('created_at'), reverse=True)
+
+        # Aggregate ETag over every job's change counter, so the listing
+        # also answers 304 while nothing moves
+        versions = tuple(sorted(
+            (bid, processor.get_status_version(bid)) for bid in processor.active_jobs
+        ))
+        return _etag_result(f'batches:{hash(versions)}', lambda: {
             'batches': batches,
             'total_count': len(batches)
-        }), 200
+        })
         
     except Exception as e:
         logger.log_error("Failed to list batches", exception=e)
-        return jsonify({'error': 'Internal server error'}), 500
+        return ojsonify({'error': 'Internal server error'}), 500
 
 @batch_bp.route('/health', methods=['GET'])
 def health_check():
@@ -293,13 +393,13 @@ def health_check():
         if not Config.OPENAI_API_KEY:
             health_status['status'] = 'unhealthy'
             health_status['error'] = 'OpenAI API key not configured'
-            return jsonify(health_status), 503
+            return ojsonify(health_status), 503
         
-        return jsonify(health_status), 200
+        return ojsonify(health_status), 200
         
     except Exception as e:
         logger.log_error("Health check failed", exception=e)
-        return jsonify({
+        return ojsonify({
             'status': 'unhealthy',
             'error': str(e)
         }), 503
@@ -3,6 +3,7 @@ Tool emulation system for conversation simulation
 """
 import json
 import random
+from collections import defaultdict
 from typing import Dict, Any, List, Optional
 from src.logging_utils import get_logger
 
@@ -11,7 +12,12 @@ class ToolEmulator:
     
     def __init__(self):
         self.logger = get_logger()
-        
+
+        # Private generator: no contention on the module-global RNG lock
+        # when tool calls run from multiple threads
+        self._rng = random.Random()
+
+
         # Sample data for tool responses
         self.menu_items = [
             {"name": "филе курицы", "price": 450, "category": "мясо"},
@@ -29,29 +35,43 @@ class ToolEmulator:
             {"zone": "восток", "delivery_time": "50-65 мин", "fee": 120},
             {"zone": "запад", "delivery_time": "35-50 мин", "fee": 90}
         ]
+
+        # Search data precomputed once: lowercased name/category per item
+        # so _search_menu stops re-lowercasing on every call, a bucket per
+        # exact category, and the name list reused by sampling helpers
+        self._menu_index = [
+            (item["name"].lower(), item["category"].lower(), item) for item in self.menu_items
+        ]
+        self._menu_by_cat = defaultdict(list)
+        for name_lc, cat_lc, item in self._menu_index:
+            self._menu_by_cat[cat_lc].append((name_lc, item))
+        self._all_names = [item["name"] for item in self.menu_items]
+
+        # O(1) tool dispatch instead of an if/elif chain of string compares
+        self._dispatch = {
+            "search_menu": self._search_menu,
+            "check_availability": self._check_availability,
+            "calculate_delivery": self._calculate_delivery,
+            "create_order": self._create_order,
+            "get_customer_history": self._get_customer_history
+        }
     
     async def call_tool(self, tool_name: str, parameters: Dict[str, Any], session_id: str) -> Dict[str, Any]:
         """Simulate calling an external tool"""
         
-        self.logger.log_info(f"Tool call: {tool_name}", extra_data={
-            'session_id': session_id,
-            'parameters': parameters
-        })
+        # Skip the f-string and extra_data dict when INFO is discarded
+        if self.logger.info_enabled():
+            self.logger.log_info(f"Tool call: {tool_name}", extra_data={
+                'session_id': session_id,
+                'parameters': parameters
+            })
         
         try:
-            if tool_name == "search_menu":
-                return await self._search_menu(parameters)
-            elif tool_name == "check_availability":
-                return await self._check_availability(parameters)
-            elif tool_name == "calculate_delivery":
-                return await self._calculate_delivery(parameters)
-            elif tool_name == "create_order":
-                return await self._create_order(parameters)
-            elif tool_name == "get_customer_history":
-                return await self._get_customer_history(parameters)
-            else:
+            handler = self._dispatch.get(tool_name)
+            if handler is None:
                 return {"error": f"Unknown tool: {tool_name}"}
-                
+            return await handler(parameters)
+
         except Exception as e:
             self.logger.log_error(f"Tool emulation error for {tool_name}", exception=e)
             return {"error": f"Tool execution failed: {str(e)}"}
@@ -60,13 +80,24 @@ class ToolEmulator:
         """Emulate menu search"""
         query = parameters.get("query", "").lower()
         category = parameters.get("category", "").lower()
-        
-        results = []
-        for item in self.menu_items:
-            if (not query or query in item["name"].lower()) and \
-               (not category or category in item["category"].lower()):
-                results.append(item)
-        
+
+        if not query and not category:
+            # No filters: the whole menu matches, skip the scan entirely
+            return {
+                "status": "success",
+                "results": self.menu_items,
+                "total_found": len(self.menu_items)
+            }
+
+        if category and category in self._menu_by_cat:
+            # Exact category hit: only that bucket needs the name filter
+            results = [item for name_lc, item in self._menu_by_cat[category]
+                       if not query or query in name_lc]
+        else:
+            results = [item for name_lc, cat_lc, item in self._menu_index
+                       if (not query or query in name_lc) and
+                          (not category or category in cat_lc)]
+
         return {
             "status": "success",
             "results": results,
@@ -78,22 +109,23 @@ class ToolEmulator:
         item_name = parameters.get("item_name", "")
         quantity = parameters.get("quantity", 1)
         
-        # Simulate random availability
-        available = random.choice([True, True, True, False])  # 75% chance available
+        # Simulate random availability: one FP compare instead of
+        # building a four-element list per call
+        available = self._rng.random() < 0.75  # 75% chance available
         
         if available:
             return {
                 "status": "available",
                 "item": item_name,
-                "quantity_available": quantity + random.randint(0, 10),
-                "estimated_prep_time": f"{random.randint(15, 45)} мин"
+                "quantity_available": quantity + self._rng.randint(0, 10),
+                "estimated_prep_time": f"{self._rng.randint(15, 45)} мин"
             }
         else:
             return {
                 "status": "unavailable",
                 "item": item_name,
                 "reason": "временно отсутствует",
-                "alternatives": random.sample([item["name"] for item in self.menu_items], 2)
+                "alternatives": self._rng.sample(self._all_names, 2)
             }
     
     async def _calculate_delivery(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
@@ -101,7 +133,7 @@ class ToolEmulator:
         address = parameters.get("address", "")
         
         # Simulate zone detection
-        zone_info = random.choice(self.delivery_zones)
+        zone_info = self._rng.choice(self.delivery_zones)
         
         return {
             "status": "success",
@@ -116,14 +148,14 @@ class ToolEmulator:
         items = parameters.get("items", [])
         customer_info = parameters.get("customer_info", {})
         
-        order_id = f"ORD-{random.randint(10000, 99999)}"
+        order_id = f"ORD-{self._rng.randrange(10000, 100000)}"
         total_amount = sum(item.get("price", 0) * item.get("quantity", 1) for item in items)
         
         return {
             "status": "created",
             "order_id": order_id,
             "total_amount": total_amount,
-            "estimated_delivery": f"{random.randint(30, 60)} мин",
+            "estimated_delivery": f"{self._rng.randint(30, 60)} мин",
             "items": items,
             "customer": customer_info
         }
@@ -133,14 +165,14 @@ class ToolEmulator:
         phone = parameters.get("phone", "")
         
         # Simulate customer history
-        has_history = random.choice([True, False])
+        has_history = self._rng.random() < 0.5
         
         if has_history:
             return {
                 "status": "found",
-                "customer_id": f"CUST-{random.randint(1000, 9999)}",
-                "previous_orders": random.randint(1, 15),
-                "favorite_items": random.sample([item["name"] for item in self.menu_items], 2),
+                "customer_id": f"CUST-{self._rng.randrange(1000, 10000)}",
+                "previous_orders": self._rng.randint(1, 15),
+                "favorite_items": self._rng.sample(self._all_names, 2),
                 "last_order_date": "2025-05-28"
             }
         else:
@@ -2,73 +2,124 @@
 Webhook integration for session initialization
 """
 import aiohttp
+import os
 import uuid
-import json
 from typing import Optional, Dict, Any
 from src.config import Config
 from src.logging_utils import get_logger
 
+class _UUIDPool:
+    """Batched random session ids
+
+    str(uuid.uuid4()) costs one urandom read per call; launching a large
+    batch generates thousands of sessions. The pool draws 16*n random
+    bytes in one syscall and slices per id. State is only touched
+    between awaits, so event-loop use needs no lock.
+    """
+
+    def __init__(self, n: int = 4096):
+        self._n = n
+        self._buf = os.urandom(16 * n)
+        self._i = 0
+
+    def next(self) -> str:
+        if self._i == self._n:
+            self._buf = os.urandom(16 * self._n)
+            self._i = 0
+        offset = self._i * 16
+        self._i += 1
+        return str(uuid.UUID(bytes=self._buf[offset:offset + 16], version=4))
+
+_uuid_pool = _UUIDPool()
+
 class WebhookManager:
     """Manages webhook interactions for session initialization"""
-    
+
     def __init__(self):
         self.logger = get_logger()
         self.webhook_url = Config.WEBHOOK_URL
-    
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Lazily create the shared HTTP session
+
+        One session for the manager's lifetime keeps the TCP connection
+        pool, DNS cache, and TLS state warm across webhook calls, so
+        repeat calls cost a round trip instead of a fresh handshake.
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=Config.CONCURRENCY,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=30
+                ),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections; call on application shutdown"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
     async def initialize_session(self) -> str:
         """Initialize a new session via webhook or generate UUID"""
-        
+
         if not self.webhook_url:
             # If no webhook URL configured, generate a UUID
-            session_id = str(uuid.uuid4())
-            self.logger.log_info(f"Generated session ID (no webhook): {session_id}")
+            session_id = _uuid_pool.next()
+            if self.logger.info_enabled():
+                self.logger.log_info(f"Generated session ID (no webhook): {session_id}")
             return session_id
-        
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.webhook_url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        session_id = data.get('session_id')
-                        
-                        if session_id:
+            session = self._get_session()
+            async with session.get(self.webhook_url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    session_id = data.get('session_id')
+
+                    if session_id:
+                        if self.logger.info_enabled():
                             self.logger.log_info(f"Retrieved session ID from webhook: {session_id}")
-                            return session_id
-                        else:
-                            self.logger.log_error("Webhook response missing session_id field")
+                        return session_id
                     else:
-                        self.logger.log_error(f"Webhook request failed with status: {response.status}")
-                        
+                        self.logger.log_error("Webhook response missing session_id field")
+                else:
+                    self.logger.log_error(f"Webhook request failed with status: {response.status}")
+
         except Exception as e:
             self.logger.log_error("Failed to initialize session via webhook", exception=e)
-        
+
         # Fallback to UUID generation
-        session_id = str(uuid.uuid4())
-        self.logger.log_info(f"Generated fallback session ID: {session_id}")
+        session_id = _uuid_pool.next()
+        if self.logger.info_enabled():
+            self.logger.log_info(f"Generated fallback session ID: {session_id}")
         return session_id
-    
+
     async def validate_webhook(self) -> bool:
         """Validate that webhook is accessible and returns expected format"""
-        
+
         if not self.webhook_url:
             return True  # No webhook configured is valid
-        
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.webhook_url, timeout=5) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'session_id' in data:
-                            self.logger.log_info("Webhook validation successful")
-                            return True
-                        else:
-                            self.logger.log_error("Webhook validation failed: missing session_id field")
-                            return False
+            session = self._get_session()
+            async with session.get(self.webhook_url,
+                                   timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if 'session_id' in data:
+                        self.logger.log_info("Webhook validation successful")
+                        return True
                     else:
-                        self.logger.log_error(f"Webhook validation failed: status {response.status}")
+                        self.logger.log_error("Webhook validation failed: missing session_id field")
                         return False
-                        
+                else:
+                    self.logger.log_error(f"Webhook validation failed: status {response.status}")
+                    return False
+
         except Exception as e:
             self.logger.log_error("Webhook validation failed", exception=e)
             return False
-
@@ -4,12 +4,12 @@ Helper script for summarizing simulation results
 Usage: python summarise_results.py <results_file> [--format csv|json] [--output output_file]
 """
 import argparse
-import json
+import statistics
 import sys
 import os
-from typing import Dict, List, Any
+from typing import Any, Dict, Iterable, Iterator, List
+import orjson
 import pandas as pd
-import matplotlib.pyplot as plt
 from src.result_storage import ResultStorage
 
 def load_results(filepath: str) -> List[Dict[str, Any]]:
@@ -17,101 +17,154 @@ def load_results(filepath: str) -> List[Dict[str, Any]]:
     storage = ResultStorage()
     return storage.load_results_from_file(filepath)
 
+def iter_ndjson(filepath: str) -> Iterator[Dict[str, Any]]:
+    """Yield result dicts from an NDJSON file one line at a time"""
+    with open(filepath, 'rb', buffering=1 << 20) as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
+
 def generate_histogram(scores: List[int], output_path: str = None):
-    """Generate score distribution histogram"""
-    plt.figure(figsize=(8, 6))
-    plt.hist(scores, bins=[0.5, 1.5, 2.5, 3.5], alpha=0.7, edgecolor='black')
-    plt.xlabel('Score')
-    plt.ylabel('Frequency')
-    plt.title('Score Distribution')
-    plt.xticks([1, 2, 3])
-    plt.grid(True, alpha=0.3)
-    
+    """Generate score distribution histogram
+
+    matplotlib is imported lazily so runs that never plot skip its
+    startup cost entirely; file output goes through the OO Agg API,
+    which avoids the pyplot state machine and GUI backend imports.
+    """
     if output_path:
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=(8, 6))
+        ax = fig.subplots()
+        ax.hist(scores, bins=[0.5, 1.5, 2.5, 3.5], alpha=0.7, edgecolor='black')
+        ax.set_xlabel('Score')
+        ax.set_ylabel('Frequency')
+        ax.set_title('Score Distribution')
+        ax.set_xticks([1, 2, 3])
+        ax.grid(True, alpha=0.3)
+        FigureCanvasAgg(fig).print_figure(output_path, dpi=300, bbox_inches='tight')
         print(f"Histogram saved to: {output_path}")
     else:
+        # Interactive display still needs pyplot's window management
+        import matplotlib.pyplot as plt
+
+        plt.figure(figsize=(8, 6))
+        plt.hist(scores, bins=[0.5, 1.5, 2.5, 3.5], alpha=0.7, edgecolor='black')
+        plt.xlabel('Score')
+        plt.ylabel('Frequency')
+        plt.title('Score Distribution')
+        plt.xticks([1, 2, 3])
+        plt.grid(True, alpha=0.3)
         plt.show()
-    
-    plt.close()
+        plt.close()
 
-def print_summary_stats(results: List[Dict[str, Any]]):
-    """Print summary statistics to console"""
-    if not results:
+def print_summary_stats(results: Iterable[Dict[str, Any]]):
+    """Print summary statistics to console
+
+    Accepts any iterable of result dicts (a list or the iter_ndjson
+    stream) and accumulates everything in one pass; only the numeric
+    values are retained, so the large conversation dicts never need to
+    be held in memory at once.
+    """
+    total = 0
+    successful = 0
+    failed = 0
+    scores: List[float] = []
+    score_hist = {1: 0, 2: 0, 3: 0}
+    turns: List[float] = []
+    durations: List[float] = []
+    # scenario -> [score_sum, score_count, turns_sum, turns_count]
+    scenario_acc: Dict[str, List[float]] = {}
+
+    for result in results:
+        total += 1
+        status = result.get('status')
+        if status == 'completed':
+            successful += 1
+        elif status == 'failed':
+            failed += 1
+
+        score = result.get('score')
+        turn_count = result.get('total_turns')
+        duration = result.get('duration_seconds')
+
+        scenario = result.get('scenario')
+        acc = scenario_acc.get(scenario)
+        if acc is None:
+            acc = scenario_acc[scenario] = [0.0, 0, 0.0, 0]
+
+        if score is not None:
+            scores.append(score)
+            if score in score_hist:
+                score_hist[score] += 1
+            acc[0] += score
+            acc[1] += 1
+        if turn_count is not None:
+            turns.append(turn_count)
+            acc[2] += turn_count
+            acc[3] += 1
+        if duration is not None:
+            durations.append(duration)
+
+    if total == 0:
         print("No results to summarize")
         return
-    
-    df = pd.DataFrame(results)
-    
+
     print("=== SIMULATION RESULTS SUMMARY ===\n")
-    
-    # Basic counts
-    total = len(results)
-    successful = len(df[df['status'] == 'completed'])
-    failed = len(df[df['status'] == 'failed'])
-    
+
     print(f"Total scenarios: {total}")
     print(f"Successful: {successful} ({successful/total*100:.1f}%)")
     print(f"Failed: {failed} ({failed/total*100:.1f}%)")
     print()
-    
+
     # Score statistics
-    scores = df['score'].dropna()
-    if len(scores) > 0:
+    if scores:
         print("=== SCORE STATISTICS ===")
-        print(f"Mean score: {scores.mean():.2f}")
-        print(f"Median score: {scores.median():.2f}")
-        print(f"Standard deviation: {scores.std():.2f}")
-        print(f"Min score: {scores.min()}")
-        print(f"Max score: {scores.max()}")
+        print(f"Mean score: {statistics.fmean(scores):.2f}")
+        print(f"Median score: {statistics.median(scores):.2f}")
+        std = statistics.stdev(scores) if len(scores) > 1 else 0.0
+        print(f"Standard deviation: {std:.2f}")
+        print(f"Min score: {min(scores):.0f}")
+        print(f"Max score: {max(scores):.0f}")
         print()
-        
+
         print("=== SCORE DISTRIBUTION ===")
-        score_counts = scores.value_counts().sort_index()
         for score in [1, 2, 3]:
-            count = score_counts.get(score, 0)
+            count = score_hist[score]
             percentage = count / len(scores) * 100
             print(f"Score {score}: {count} ({percentage:.1f}%)")
         print()
-    
+
     # Turn statistics
-    turns = df['total_turns'].dropna()
-    if len(turns) > 0:
+    if turns:
         print("=== CONVERSATION LENGTH STATISTICS ===")
-        print(f"Mean turns: {turns.mean():.1f}")
-        print(f"Median turns: {turns.median():.1f}")
-        print(f"Min turns: {turns.min()}")
-        print(f"Max turns: {turns.max()}")
+        print(f"Mean turns: {statistics.fmean(turns):.1f}")
+        print(f"Median turns: {statistics.median(turns):.1f}")
+        print(f"Min turns: {min(turns):.0f}")
+        print(f"Max turns: {max(turns):.0f}")
         print()
-    
+
     # Duration statistics
-    durations = df['duration_seconds'].dropna()
-    if len(durations) > 0:
+    if durations:
         print("=== DURATION STATISTICS ===")
-        print(f"Mean duration: {durations.mean():.1f} seconds")
-        print(f"Median duration: {durations.median():.1f} seconds")
-        print(f"Total duration: {durations.sum():.1f} seconds")
-        print(f"Min duration: {durations.min():.1f} seconds")
-        print(f"Max duration: {durations.max():.1f} seconds")
+        print(f"Mean duration: {statistics.fmean(durations):.1f} seconds")
+        print(f"Median duration: {statistics.median(durations):.1f} seconds")
+        print(f"Total duration: {sum(durations):.1f} seconds")
+        print(f"Min duration: {min(durations):.1f} seconds")
+        print(f"Max duration: {max(durations):.1f} seconds")
         print()
-    
-    # Scenario breakdown
-    if 'scenario' in df.columns:
+
+    # Scenario breakdown, in first-seen order like the old groupby
+    if scenario_acc:
         print("=== PERFORMANCE BY SCENARIO ===")
-        scenario_stats = df.groupby('scenario').agg({
-            'score': ['mean', 'count'],
-            'total_turns': 'mean'
-        }).round(2)
-        
-        for scenario in scenario_stats.index:
-            mean_score = scenario_stats.loc[scenario, ('score', 'mean')]
-            count = scenario_stats.loc[scenario, ('score', 'count')]
-            mean_turns = scenario_stats.loc[scenario, ('total_turns', 'mean')]
-            
+        for scenario, acc in scenario_acc.items():
             print(f"{scenario}:")
-            print(f"  Count: {count}")
-            print(f"  Mean score: {mean_score:.2f}")
-            print(f"  Mean turns: {mean_turns:.1f}")
+            print(f"  Count: {acc[1]}")
+            if acc[1]:
+                print(f"  Mean score: {acc[0]/acc[1]:.2f}")
+            if acc[3]:
+                print(f"  Mean turns: {acc[2]/acc[3]:.1f}")
             print()
 
 def save_summary_json(results: List[Dict[str, Any]], output_path: str):
@@ -119,8 +172,9 @@ def save_summary_json(results: List[Dict[str, Any]], output_path: str):
     storage = ResultStorage()
     summary = storage.generate_summary_report("summary", results)
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(summary, f, ensure_ascii=False, indent=2)
+    # orjson writes UTF-8 bytes directly, so no ensure_ascii round-trip
+    with open(output_path, 'wb') as f:
+        f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2, default=str))
     
     print(f"Summary saved to: {output_path}")
 
@@ -157,11 +211,18 @@ def main():
         sys.exit(1)
     
     try:
-        # Load results
-        results = load_results(args.results_file)
-        
+        # Only materialize the result list when a later step needs it;
+        # a console-only run over NDJSON streams line by line instead
+        needs_list = bool(args.histogram or (args.output and args.format))
+        if needs_list or not args.results_file.endswith('.ndjson'):
+            results = load_results(args.results_file)
+            source = results
+        else:
+            results = None
+            source = iter_ndjson(args.results_file)
+
         if not args.quiet:
-            print_summary_stats(results)
+            print_summary_stats(source)
         
         # Generate histogram if requested
         if args.histogram: